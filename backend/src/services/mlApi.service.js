@@ -10,6 +10,8 @@ const mlApiClient = axios.create({
   timeout: ML_API_TIMEOUT,
   headers: {
     "Content-Type": "application/json",
+    // Lets the ML service shed requests it cannot answer before we give up
+    "X-Deadline-Ms": String(ML_API_TIMEOUT),
   },
 });
 
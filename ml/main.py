@@ -2,38 +2,96 @@
 
 import argparse
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+import hmac
+import json
 import math
+import os
+import numpy as np
 
 from src.scaling_bridge import ScalingBridge
-from src.predict import ModelPredictor
+from src.predict import ModelPredictor, DISEASE_MAP, MODEL_PATH
 from src.explainability import ExplainabilityEngine
-from src.schemas import PredictRequest, PredictResponse
+from src.drift_monitor import DriftMonitor
+from src.audit_log import AuditLog
+from src.neighbors import NeighborIndex
+from src.admission import AdmissionController, AdmissionMiddleware
+from src.explain_pool import ExplanationPool, ExplainQueueFull, ExplainTimeout, ExplainUnavailable
+from src import profiler
+from src import binary_format
+from src.schemas import PredictRequest, PredictResponse, PredictBatchRequest, PredictBatchResponse
 
 startup_error = None
+scaler = predictor = explainer = neighbor_index = None
+feature_order = []
+monitor = DriftMonitor(feature_order)
 
-try:
-    scaler = ScalingBridge()
-    predictor = ModelPredictor()
-    feature_order = scaler.feature_order
+# Spawned SHAP workers (src/explain_pool.py) re-run this file as
+# __mp_main__; they load their own model, so skip everything here.
+if __name__ != "__mp_main__":
+    try:
+        scaler = ScalingBridge()
+        predictor = ModelPredictor()
+        feature_order = scaler.feature_order
 
-    explainer = ExplainabilityEngine(
-        predictor.model,
-        feature_order
-    )
+        explainer = ExplainabilityEngine(
+            predictor.model,
+            feature_order
+        )
+
+        print("[main] Loaded all components successfully")
+
+    except Exception as e:
+        startup_error = str(e)
+        scaler = predictor = explainer = None
+        feature_order = []
+        print("[main] Startup error:", startup_error)
 
-    print("[main] Loaded all components successfully")
+    # Drift monitor (reference = scaled training split)
+    try:
+        monitor = DriftMonitor.from_reference(feature_order, label_map=DISEASE_MAP)
+    except Exception as e:
+        monitor = DriftMonitor(feature_order)
+        print("[main] Drift reference unavailable:", e)
 
-except Exception as e:
-    startup_error = str(e)
-    scaler = predictor = explainer = None
-    feature_order = []
-    print("[main] Startup error:", startup_error)
+    # Similar-patient index (built at training time, memory-mapped)
+    try:
+        neighbor_index = NeighborIndex()
+    except Exception as e:
+        neighbor_index = None
+        print("[main] Neighbour index unavailable:", e)
+
+# Audit trail (background writer, never blocks a request)
+audit = AuditLog(
+    feature_order,
+    list(DISEASE_MAP.values()),
+    out_dir=os.environ.get("AUDIT_DIR", "outputs/audit"),
+    capacity=int(os.environ.get("AUDIT_CAPACITY", 65536)),
+    flush_rows=int(os.environ.get("AUDIT_FLUSH_ROWS", 1024)),
+    flush_interval=float(os.environ.get("AUDIT_FLUSH_INTERVAL", 1.0)),
+    rotate_rows=int(os.environ.get("AUDIT_ROTATE_ROWS", 1_000_000)),
+)
 
 # API
 app = FastAPI(title="Medical ML API")
 
+# Admission control for the predict endpoints (outermost CORS still applies)
+admission = AdmissionController(
+    max_in_flight=int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", 8)),
+    max_bulk_in_flight=int(os.environ.get("ADMISSION_MAX_BULK_IN_FLIGHT", 4)),
+    max_queue={
+        "interactive": int(os.environ.get("ADMISSION_INTERACTIVE_QUEUE", 64)),
+        "bulk": int(os.environ.get("ADMISSION_BULK_QUEUE", 16)),
+    },
+    default_deadline_ms=float(os.environ.get("ADMISSION_DEFAULT_DEADLINE_MS", 30000)),
+)
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -41,6 +99,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# SHAP offload to worker processes (EXPLAIN_WORKERS=0 keeps it in-process).
+# Started on server startup, not import, so spawned workers never re-create it.
+explain_pool = None
+
+@app.on_event("startup")
+def start_audit():
+    audit.start()
+
+@app.on_event("startup")
+def start_explain_pool():
+    global explain_pool
+    workers = int(os.environ.get("EXPLAIN_WORKERS", 0))
+    if workers > 0 and predictor is not None:
+        explain_pool = ExplanationPool(
+            MODEL_PATH,
+            feature_order,
+            workers=workers,
+            queue_len=int(os.environ.get("EXPLAIN_QUEUE_LEN", 64)),
+            submit_timeout=float(os.environ.get("EXPLAIN_SUBMIT_TIMEOUT", 1.0)),
+            task_timeout=float(os.environ.get("EXPLAIN_TASK_TIMEOUT", 30.0)),
+        )
+        # serve only once a warm worker can take requests
+        if explain_pool.wait_ready(float(os.environ.get("EXPLAIN_WARMUP_TIMEOUT", 120.0))):
+            print(f"[main] SHAP offloaded to {workers} worker processes")
+        else:
+            print("[main] SHAP workers not ready yet; first requests may be slow")
+
+@app.on_event("shutdown")
+def stop_audit():
+    audit.close()
+
+@app.on_event("shutdown")
+def stop_explain_pool():
+    if explain_pool is not None:
+        explain_pool.close()
+
 @app.get("/health")
 def health():
     if predictor is None:
@@ -56,33 +150,284 @@ def clean(d):
             out[k] = float(v)
     return out
 
-@app.post("/predict", response_model=PredictResponse)
-def predict_api(req: PredictRequest):
-
-    if predictor is None:
-        raise HTTPException(503, f"Startup error: {startup_error}")
-
-    # scale
-    Xs = scaler.scale_dict(req.features)
+def predict_stage(features):
+    """Scale + predict (cheap). Returns (Xs, scaled_map, pred, probs)."""
+    # scale (unclipped copy feeds the drift monitor's clip counters)
+    try:
+        X_raw = scaler.scale_dict(features, clip=False)
+    except KeyError as e:
+        raise HTTPException(422, e.args[0])
+    Xs = np.clip(X_raw, 0.0, 1.0)
     scaled_map = {feat: float(Xs[0][i]) for i, feat in enumerate(feature_order)}
 
     # predict
     pred, probs = predictor.predict(Xs)
+    monitor.observe(X_raw, [pred["label"]])
+
+    return Xs, scaled_map, pred, probs
+
+def explain_stage(features):
+    """SHAP attributions (expensive). Returns the full shap_map."""
+    if explain_pool is None:
+        return explainer.compute_and_return(features)
+    try:
+        return explain_pool.compute_and_return(features)
+    except (ExplainQueueFull, ExplainUnavailable) as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "1"})
+    except ExplainTimeout as e:
+        raise HTTPException(504, str(e), headers={"Retry-After": "5"})
+
+def audit_stage(features, pred, probs, shap_map=None):
+    """Audit record: raw inputs in feature_order + strongest attribution (NaN without SHAP)."""
+    top_feat = max(shap_map, key=lambda k: abs(shap_map[k])) if shap_map else None
+    audit.submit(
+        [[float(features[f]) for f in feature_order]],
+        [list(probs.values())],
+        [pred["label"]],
+        model_version=predictor.version,
+        top_features=[top_feat],
+        top_shap=[shap_map.get(top_feat, float("nan")) if shap_map else float("nan")],
+    )
+
+def top_shap(shap_map, top_k):
+    if not top_k:
+        return shap_map
+    return dict(sorted(shap_map.items(), key=lambda x: abs(x[1]), reverse=True)[:top_k])
+
+def neighbors_stage(Xs, k):
+    """Similar historical patients, or None when not requested."""
+    if not k:
+        return None
+    idx, dist = neighbor_index.query(Xs, k=k)
+    labels = neighbor_index.labels(idx[0], label_map=DISEASE_MAP)
+    return [
+        {"index": int(i), "label": label, "distance": float(d)}
+        for i, label, d in zip(idx[0], labels, dist[0])
+    ]
+
+def check_ready(req: PredictRequest):
+    if predictor is None:
+        raise HTTPException(503, f"Startup error: {startup_error}")
+    if req.neighbors and neighbor_index is None:
+        raise HTTPException(503, "Neighbour index not built")
 
-    # shap
-    shap_map = explainer.compute_and_return(req.features)
+@app.post("/predict", response_model=PredictResponse)
+def predict_api(req: PredictRequest):
 
-    # top K
-    if req.top_k:
-        shap_map = dict(sorted(shap_map.items(), key=lambda x: abs(x[1]), reverse=True)[:req.top_k])
+    check_ready(req)
+
+    Xs, scaled_map, pred, probs = predict_stage(req.features)
+    shap_map = explain_stage(req.features)
+    audit_stage(req.features, pred, probs, shap_map)
 
     return {
         "prediction": pred,
         "probabilities": probs,
         "scaled_values": clean(scaled_map),
-        "shap_values": clean(shap_map)
+        "shap_values": clean(top_shap(shap_map, req.top_k)),
+        "neighbors": neighbors_stage(Xs, req.neighbors)
+    }
+
+@app.post("/predict/stream")
+def predict_stream_api(req: PredictRequest, request: Request):
+    """
+    Two-phase variant of /predict. Frame 1 carries the prediction and
+    probabilities as soon as the model has scored; frame 2 carries the
+    scaled values, SHAP attributions (and neighbours if requested).
+
+    NDJSON by default; Server-Sent Events when Accept: text/event-stream.
+    """
+
+    check_ready(req)
+
+    # run scoring before streaming so input errors still get a 4xx status
+    Xs, scaled_map, pred, probs = predict_stage(req.features)
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    def frame(event, payload):
+        if sse:
+            return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps({"event": event, **payload}) + "\n"
+
+    def frames():
+        shap_map = None
+        try:
+            yield frame("prediction", {"prediction": pred, "probabilities": probs})
+            try:
+                shap_map = explain_stage(req.features)
+                yield frame("explanation", {
+                    "scaled_values": clean(scaled_map),
+                    "shap_values": clean(top_shap(shap_map, req.top_k)),
+                    "neighbors": neighbors_stage(Xs, req.neighbors),
+                })
+            except Exception as e:
+                yield frame("error", {"detail": f"Explanation failed: {e}"})
+        finally:
+            # the prediction frame has gone out: audit it even if SHAP
+            # failed or the client disconnected
+            audit_stage(req.features, pred, probs, shap_map)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def score_matrix(X):
+    """Raw (n_rows x 24) matrix in feature_order → (labels, probs)"""
+    X_raw = scaler.scale_matrix(X, clip=False)
+    labels, probs = predictor.predict_batch(np.clip(X_raw, 0.0, 1.0))
+    monitor.observe(X_raw, labels)
+    audit.submit(X, probs, labels, model_version=predictor.version)
+    return labels, probs
+
+def predict_batch_json(req: PredictBatchRequest):
+    try:
+        X = np.array([[row[f] for f in feature_order] for row in req.rows], dtype=float)
+    except KeyError as e:
+        raise HTTPException(422, f"Missing input: {e.args[0]}")
+
+    if X.shape[0] == 0:
+        return {"predictions": [], "probabilities": []}
+
+    labels, probs = score_matrix(X)
+
+    return {
+        "predictions": [{"label": label} for label in labels],
+        "probabilities": [predictor.probs_to_map(p) for p in probs]
     }
 
+def predict_batch_binary(body, content_type, headers):
+    class_names = list(DISEASE_MAP.values())
+    dtype = headers.get("x-dtype", "float32")
+
+    try:
+        if content_type == binary_format.RAW_MEDIA_TYPE:
+            columns = [c.strip() for c in headers.get("x-feature-order", "").split(",") if c.strip()]
+            X = binary_format.decode_raw(body, columns, dtype, feature_order)
+        else:
+            X = binary_format.decode_arrow(body, feature_order)
+    except KeyError as e:
+        raise HTTPException(422, f"Missing input: {e.args[0]}")
+    except Exception as e:
+        raise HTTPException(422, f"Invalid {content_type} body: {e}")
+
+    if X.shape[0]:
+        labels, probs = score_matrix(X)
+    else:
+        labels, probs = [], np.empty((0, len(class_names)))
+
+    if content_type == binary_format.RAW_MEDIA_TYPE:
+        # rows x classes, class order in header; label = argmax per row
+        return Response(
+            binary_format.encode_raw(probs, dtype),
+            media_type=binary_format.RAW_MEDIA_TYPE,
+            headers={"X-Class-Order": ",".join(class_names), "X-Dtype": dtype, "X-Rows": str(len(labels))},
+        )
+
+    return Response(
+        binary_format.encode_arrow(labels, probs, class_names),
+        media_type=binary_format.ARROW_MEDIA_TYPE,
+    )
+
+BINARY_SCHEMA = {"schema": {"type": "string", "format": "binary"}}
+
+@app.post(
+    "/predict/batch",
+    response_model=PredictBatchResponse,
+    # the body is read raw for content negotiation, so declare it here
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": PredictBatchRequest.model_json_schema()},
+                binary_format.RAW_MEDIA_TYPE: BINARY_SCHEMA,
+                binary_format.ARROW_MEDIA_TYPE: BINARY_SCHEMA,
+            },
+        },
+    },
+    responses={200: {"content": {
+        binary_format.RAW_MEDIA_TYPE: BINARY_SCHEMA,
+        binary_format.ARROW_MEDIA_TYPE: BINARY_SCHEMA,
+    }}},
+)
+async def predict_batch_api(request: Request):
+    """
+    JSON ({"rows": [...]}) by default. High-volume callers can instead send
+      - application/octet-stream: little-endian float32/float64 row-major
+        matrix, columns named by X-Feature-Order, dtype in X-Dtype
+      - application/vnd.apache.arrow.stream: Arrow IPC record batch(es)
+    and receive the result in the same binary form.
+    """
+
+    if predictor is None:
+        raise HTTPException(503, f"Startup error: {startup_error}")
+
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    body = await request.body()
+
+    if content_type in (binary_format.RAW_MEDIA_TYPE, binary_format.ARROW_MEDIA_TYPE):
+        return await run_in_threadpool(predict_batch_binary, body, content_type, request.headers)
+
+    try:
+        req = PredictBatchRequest.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    return await run_in_threadpool(predict_batch_json, req)
+
+@app.get("/drift")
+def drift():
+    return monitor.report()
+
+@app.get("/audit")
+def audit_stats():
+    return audit.report()
+
+@app.get("/admission")
+def admission_stats():
+    return admission.report()
+
+@app.get("/explainer")
+def explainer_stats():
+    if explain_pool is None:
+        return {"mode": "in-process"}
+    return {"mode": "process-pool", **explain_pool.report()}
+
+# -----------------------------------------------------
+# Admin: on-demand profiling (off unless PROFILER_TOKEN is set)
+# -----------------------------------------------------
+PROFILER_TOKEN = os.environ.get("PROFILER_TOKEN")
+PROFILER_MAX_SECONDS = 60.0
+
+def require_admin(request: Request, seconds: float):
+    if not PROFILER_TOKEN:
+        raise HTTPException(404, "Not Found")
+    token = request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(token.encode(), PROFILER_TOKEN.encode()):
+        raise HTTPException(403, "Invalid admin token")
+    if not 0 < seconds <= PROFILER_MAX_SECONDS:
+        raise HTTPException(422, f"seconds must be in (0, {PROFILER_MAX_SECONDS}]")
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+def profile_api(request: Request, seconds: float = 5.0, interval_ms: float = 5.0):
+    """Sampling profile of all threads; collapsed stacks (flamegraph input)."""
+    require_admin(request, seconds)
+    try:
+        stacks = profiler.sample_stacks(seconds, interval=max(interval_ms, 1.0) / 1000.0)
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(409, str(e))
+    return profiler.collapsed(stacks)
+
+@app.get("/admin/allocations")
+def allocations_api(request: Request, seconds: float = 5.0, top: int = 20):
+    """tracemalloc top allocation sites in main / ScalingBridge / ExplainabilityEngine."""
+    require_admin(request, seconds)
+    try:
+        return profiler.trace_allocations(seconds, top=top)
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(409, str(e))
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--serve", action="store_true")
@@ -90,6 +435,6 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     if args.serve:
-        uvicorn.run("main:app", host="0.0.0.0", port=args.port)
+        uvicorn.run(app, host="0.0.0.0", port=args.port)
     else:
         parser.print_help()
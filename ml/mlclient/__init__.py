@@ -0,0 +1 @@
+from .client import MLClient, AsyncMLClient, OfflineClient, MLClientError
@@ -0,0 +1,422 @@
+# mlclient/client.py
+"""
+Python client for the ML API.
+
+    from mlclient import MLClient, AsyncMLClient, OfflineClient
+
+    with MLClient("http://localhost:8000") as ml:
+        ml.predict(features)            # coalesced into /predict/batch
+        ml.predict_many(rows)           # one binary float64 request per chunk
+        ml.explain(features, top_k=5)   # full /predict with SHAP
+
+All three clients expose the same methods; OfflineClient runs the
+in-process ScalingBridge / ModelPredictor instead of HTTP.
+
+Only httpx and numpy are imported here; OfflineClient imports the model
+stack (src/) when constructed.
+"""
+
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import httpx
+import numpy as np
+
+RETRY_STATUSES = (429, 502, 503, 504)
+# Statuses that mean a row itself is bad: a coalesced batch rejected with
+# one of these is resent row by row. Anything else fails the whole batch.
+SPLIT_STATUSES = (400, 422)
+RAW_MEDIA_TYPE = "application/octet-stream"
+
+
+class MLClientError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(f"ML API error {status}: {detail}")
+        self.status = status
+        self.detail = detail
+
+
+class _ClientBase:
+    def __init__(self, base_url="http://localhost:8000", timeout=30.0,
+                 max_connections=16, max_concurrency=8, max_retries=3,
+                 backoff_base=0.1, backoff_max=5.0, batch_window_ms=5.0,
+                 max_batch=256, deadline_ms=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch = max_batch
+        self.deadline_ms = deadline_ms
+        self._limits = httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_connections)
+
+    def _headers(self, priority):
+        headers = {"X-Priority": priority}
+        if self.deadline_ms:
+            headers["X-Deadline-Ms"] = str(self.deadline_ms)
+        return headers
+
+    def _delay(self, attempt, response=None):
+        """Server's Retry-After when given, else exponential backoff with full jitter."""
+        if response is not None and response.headers.get("retry-after"):
+            try:
+                return min(float(response.headers["retry-after"]), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _raise_for(response):
+        try:
+            detail = response.json().get("detail")
+        except Exception:
+            detail = response.text
+        raise MLClientError(response.status_code, detail)
+
+    @staticmethod
+    def _encode_matrix(rows):
+        columns = list(rows[0].keys())
+        X = np.array([[row[c] for c in columns] for row in rows], dtype="<f8")
+        return columns, X.tobytes()
+
+    @staticmethod
+    def _decode_matrix(response):
+        classes = response.headers["x-class-order"].split(",")
+        probs = np.frombuffer(response.content, dtype="<f8").reshape(-1, len(classes))
+        return [
+            {"prediction": {"label": classes[int(np.argmax(p))]},
+             "probabilities": dict(zip(classes, map(float, p)))}
+            for p in probs
+        ]
+
+    @staticmethod
+    def _fail(batch, error):
+        for _, fut in batch:
+            if not fut.done():
+                fut.set_exception(error)
+
+    @staticmethod
+    def _split_batch(body):
+        return [
+            {"prediction": pred, "probabilities": probs}
+            for pred, probs in zip(body["predictions"], body["probabilities"])
+        ]
+
+
+# -----------------------------------------------------
+# Sync client
+# -----------------------------------------------------
+class MLClient(_ClientBase):
+    """
+    Thread-safe sync client. One pooled keep-alive httpx.Client is shared
+    by all threads; concurrent predict() calls landing within
+    batch_window_ms are sent as one /predict/batch request, and at most
+    max_concurrency HTTP requests are in flight at once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._http = httpx.Client(base_url=self.base_url, timeout=self.timeout, limits=self._limits)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._senders = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="mlclient")
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._closed = False
+        self._batcher = threading.Thread(target=self._batch_loop, name="mlclient-batcher", daemon=True)
+        self._batcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._batcher.join()
+        self._senders.shutdown(wait=True)
+        self._http.close()
+
+    def _request(self, method, path, priority="interactive", **kwargs):
+        headers = {**self._headers(priority), **kwargs.pop("headers", {})}
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                with self._slots:
+                    response = self._http.request(method, path, headers=headers, **kwargs)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+            else:
+                if response.status_code < 400:
+                    return response
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    self._raise_for(response)
+            time.sleep(self._delay(attempt, response))
+
+    # --- batching -------------------------------------------------
+    def _batch_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+                deadline = time.monotonic() + self.batch_window
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self._senders.submit(self._send_batch, batch)
+
+    def _send_batch(self, batch):
+        try:
+            response = self._request("POST", "/predict/batch", json={"rows": [row for row, _ in batch]})
+            for (_, fut), result in zip(batch, self._split_batch(response.json())):
+                fut.set_result(result)
+        except MLClientError as e:
+            if len(batch) > 1 and e.status in SPLIT_STATUSES:
+                # one bad row rejects the whole batch: resend singly so
+                # only the caller that sent it gets the error
+                for item in batch:
+                    self._send_batch([item])
+            else:
+                self._fail(batch, e)
+        except Exception as e:
+            self._fail(batch, e)
+
+    # --- public API -----------------------------------------------
+    def predict(self, features):
+        """One row → {"prediction", "probabilities"} (coalesced with concurrent calls)."""
+        fut = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Client is closed")
+            self._pending.append((features, fut))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        return fut.result()
+
+    def predict_many(self, rows):
+        """Many rows → results, sent as binary float64 matrices (bulk lane)."""
+        results = []
+        for start in range(0, len(rows), self.max_batch * 16):
+            chunk = rows[start:start + self.max_batch * 16]
+            columns, body = self._encode_matrix(chunk)
+            response = self._request(
+                "POST", "/predict/batch", priority="bulk", content=body,
+                headers={"Content-Type": RAW_MEDIA_TYPE, "X-Dtype": "float64",
+                         "X-Feature-Order": ",".join(columns)},
+            )
+            results += self._decode_matrix(response)
+        return results
+
+    def explain(self, features, top_k=None, neighbors=None):
+        """Full /predict: prediction, probabilities, scaled values, SHAP (+ neighbours)."""
+        payload = {"features": features, "top_k": top_k, "neighbors": neighbors}
+        return self._request("POST", "/predict", json=payload).json()
+
+    def health(self):
+        return self._request("GET", "/health").json()
+
+
+# -----------------------------------------------------
+# Async client
+# -----------------------------------------------------
+class AsyncMLClient(_ClientBase):
+    """asyncio counterpart of MLClient (same batching, retries and limits)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._http = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self._limits)
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._pending:
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._http.aclose()
+
+    async def _request(self, method, path, priority="interactive", **kwargs):
+        headers = {**self._headers(priority), **kwargs.pop("headers", {})}
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                async with self._slots:
+                    response = await self._http.request(method, path, headers=headers, **kwargs)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+            else:
+                if response.status_code < 400:
+                    return response
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    self._raise_for(response)
+            await asyncio.sleep(self._delay(attempt, response))
+
+    # --- batching -------------------------------------------------
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        task = asyncio.get_running_loop().create_task(self._send_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if self._pending:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+
+    async def _send_batch(self, batch):
+        try:
+            response = await self._request("POST", "/predict/batch", json={"rows": [row for row, _ in batch]})
+            for (_, fut), result in zip(batch, self._split_batch(response.json())):
+                if not fut.done():
+                    fut.set_result(result)
+        except MLClientError as e:
+            if len(batch) > 1 and e.status in SPLIT_STATUSES:
+                # resend singly so only the bad row's caller fails
+                await asyncio.gather(*(self._send_batch([item]) for item in batch))
+            else:
+                self._fail(batch, e)
+        except Exception as e:
+            self._fail(batch, e)
+
+    # --- public API -----------------------------------------------
+    async def predict(self, features):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((features, fut))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return await fut
+
+    async def predict_many(self, rows):
+        results = []
+        for start in range(0, len(rows), self.max_batch * 16):
+            chunk = rows[start:start + self.max_batch * 16]
+            columns, body = self._encode_matrix(chunk)
+            response = await self._request(
+                "POST", "/predict/batch", priority="bulk", content=body,
+                headers={"Content-Type": RAW_MEDIA_TYPE, "X-Dtype": "float64",
+                         "X-Feature-Order": ",".join(columns)},
+            )
+            results += self._decode_matrix(response)
+        return results
+
+    async def explain(self, features, top_k=None, neighbors=None):
+        payload = {"features": features, "top_k": top_k, "neighbors": neighbors}
+        return (await self._request("POST", "/predict", json=payload)).json()
+
+    async def health(self):
+        return (await self._request("GET", "/health")).json()
+
+
+# -----------------------------------------------------
+# Offline (in-process) client
+# -----------------------------------------------------
+class OfflineClient:
+    """
+    Same interface, no HTTP: scores with ScalingBridge + ModelPredictor in
+    this process. Paths resolve relative to the ml/ directory, as for the
+    service itself. SHAP and the neighbour index are only loaded on the
+    first explain() call that needs them.
+    """
+
+    def __init__(self):
+        from src.scaling_bridge import ScalingBridge
+        from src.predict import ModelPredictor
+
+        self.scaler = ScalingBridge()
+        self.predictor = ModelPredictor()
+        self.explainer = None
+        self.neighbor_index = None
+
+    def _matrix(self, rows):
+        try:
+            return np.array([[row[f] for f in self.scaler.feature_order] for row in rows], dtype=float)
+        except KeyError as e:
+            raise MLClientError(422, f"Missing input: {e.args[0]}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def predict(self, features):
+        return self.predict_many([features])[0]
+
+    def predict_many(self, rows):
+        if not rows:
+            return []
+        labels, probs = self.predictor.predict_batch(self.scaler.scale_matrix(self._matrix(rows)))
+        return [
+            {"prediction": {"label": label}, "probabilities": self.predictor.probs_to_map(p)}
+            for label, p in zip(labels, probs)
+        ]
+
+    def explain(self, features, top_k=None, neighbors=None):
+        from src.explainability import ExplainabilityEngine
+        from src.schemas import MAX_NEIGHBORS
+
+        if neighbors is not None and not 1 <= neighbors <= MAX_NEIGHBORS:
+            raise MLClientError(422, f"neighbors must be between 1 and {MAX_NEIGHBORS}")
+        if self.explainer is None:
+            self.explainer = ExplainabilityEngine(self.predictor.model, self.scaler.feature_order)
+
+        Xs = self.scaler.scale_matrix(self._matrix([features]))
+        pred, probs = self.predictor.predict(Xs)
+        shap_map = self.explainer.compute_and_return(features)
+        if top_k:
+            shap_map = dict(sorted(shap_map.items(), key=lambda x: abs(x[1]), reverse=True)[:top_k])
+
+        return {
+            "prediction": pred,
+            "probabilities": probs,
+            "scaled_values": {f: float(Xs[0][i]) for i, f in enumerate(self.scaler.feature_order)},
+            "shap_values": shap_map,
+            "neighbors": self._neighbors(Xs, neighbors) if neighbors else None,
+        }
+
+    def _neighbors(self, Xs, k):
+        from src.neighbors import NeighborIndex
+        from src.predict import DISEASE_MAP
+
+        if self.neighbor_index is None:
+            self.neighbor_index = NeighborIndex()
+        idx, dist = self.neighbor_index.query(Xs, k=k)
+        labels = self.neighbor_index.labels(idx[0], label_map=DISEASE_MAP)
+        return [
+            {"index": int(i), "label": label, "distance": float(d)}
+            for i, label, d in zip(idx[0], labels, dist[0])
+        ]
+
+    def health(self):
+        return {"status": "ok", "features": self.scaler.feature_order}
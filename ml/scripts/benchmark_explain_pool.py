@@ -0,0 +1,76 @@
+# scripts/benchmark_explain_pool.py
+# SHAP throughput: in-process engine vs ExplanationPool with 1, 2, 4, ...
+# workers, each driven by 2 x workers client threads for a fixed time.
+# Scaling is bounded by the number of CPU cores available.
+import sys
+import os
+import time
+import argparse
+import threading
+sys.path.insert(0, ".")
+import joblib
+import numpy as np
+from src.predict import MODEL_PATH
+from src.scaling_bridge import ScalingBridge
+from src.explainability import ExplainabilityEngine
+from src.explain_pool import ExplanationPool
+
+
+def drive(explain, rows, threads, seconds):
+    """Call explain(row) from `threads` threads for `seconds`; returns (req/s, p50 ms)."""
+    done = []
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def loop(offset):
+        lat = []
+        i = offset
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            explain(rows[i % len(rows)])
+            lat.append((time.perf_counter() - t0) * 1000)
+            i += threads
+        with lock:
+            done.extend(lat)
+
+    ts = [threading.Thread(target=loop, args=(k,)) for k in range(threads)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return len(done) / (time.perf_counter() - t0), float(np.percentile(done, 50))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    scaler = ScalingBridge()
+    model = joblib.load(MODEL_PATH)
+    rng = np.random.default_rng(0)
+    rows = [
+        dict(zip(scaler.feature_order, scaler.lo + (scaler.hi - scaler.lo) * rng.random(len(scaler.lo))))
+        for _ in range(256)
+    ]
+
+    print(f"CPU cores: {os.cpu_count()}")
+    print(f"{'mode':>12} {'threads':>8} {'req/s':>9} {'p50 ms':>8} {'speedup':>8}")
+
+    engine = ExplainabilityEngine(model, scaler.feature_order)
+    engine.compute_and_return(rows[0])
+    base, p50 = drive(engine.compute_and_return, rows, 2, args.seconds)
+    print(f"{'in-process':>12} {2:>8} {base:>9.1f} {p50:>8.2f} {1.0:>8.2f}")
+
+    for w in args.workers:
+        pool = ExplanationPool(MODEL_PATH, scaler.feature_order, workers=w, queue_len=64)
+        try:
+            pool.wait_ready(120)
+            while pool.report()["ready_workers"] < w:
+                time.sleep(0.1)
+            rps, p50 = drive(pool.compute_and_return, rows, 2 * w, args.seconds)
+        finally:
+            pool.close()
+        print(f"{f'pool x{w}':>12} {2 * w:>8} {rps:>9.1f} {p50:>8.2f} {rps / base:>8.2f}")
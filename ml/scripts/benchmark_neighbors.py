@@ -0,0 +1,71 @@
+# scripts/benchmark_neighbors.py
+# Build time, query latency and memory of NeighborIndex at 10k / 100k / 1M rows.
+#   query MB:  peak heap allocated by one batch-of-100 query (tracemalloc
+#              sees NumPy buffers), i.e. the query's working set
+#   mapped MB: index pages resident after querying (RssFile, Linux only)
+#   disk MB:   size of the .npy files
+import sys
+import os
+import time
+import tempfile
+import tracemalloc
+sys.path.insert(0, ".")
+import numpy as np
+from src.neighbors import build_index, NeighborIndex
+
+D = 24
+K = 5
+QUERIES = 200
+rng = np.random.default_rng(0)
+
+
+def rss_file_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssFile:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+print(f"{'rows':>9} {'build s':>9} {'load ms':>9} {'p50 ms':>9} {'p99 ms':>9} "
+      f"{'batch100 ms':>12} {'query MB':>9} {'mapped MB':>10} {'disk MB':>9}")
+for n in (10_000, 100_000, 1_000_000):
+    X = rng.random((n, D), dtype=np.float32)
+    y = rng.integers(0, 4, n)
+    Q = rng.random((QUERIES, D), dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        build_index(X, y, out_dir=tmp)
+        build_s = time.perf_counter() - t0
+        del X
+
+        rss_before = rss_file_mb()
+        t0 = time.perf_counter()
+        index = NeighborIndex(tmp)
+        load_ms = (time.perf_counter() - t0) * 1000
+
+        index.query(Q[:1], k=K)  # warm page cache
+        lat = []
+        for q in Q:
+            t0 = time.perf_counter()
+            index.query(q, k=K)
+            lat.append((time.perf_counter() - t0) * 1000)
+
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        index.query(Q[:100], k=K)
+        batch_ms = (time.perf_counter() - t0) * 1000
+        query_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+        mapped_mb = rss_file_mb() - rss_before
+        disk_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 1e6
+        del index
+
+    print(f"{n:>9} {build_s:>9.3f} {load_ms:>9.2f} {np.percentile(lat, 50):>9.2f} "
+          f"{np.percentile(lat, 99):>9.2f} {batch_ms:>12.2f} {query_mb:>9.1f} "
+          f"{mapped_mb:>10.1f} {disk_mb:>9.1f}")
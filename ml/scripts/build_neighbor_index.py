@@ -0,0 +1,12 @@
+# scripts/build_neighbor_index.py
+# Build the similar-patient index from the saved scaled training split
+# (train_balanced.py does this automatically after training).
+import sys
+sys.path.insert(0, ".")
+import numpy as np
+from src.neighbors import build_index
+
+X = np.load("data/splits/X_train_scaled.npy")
+y = np.load("data/splits/y_train.npy", allow_pickle=True)
+index = build_index(X, y)
+print(f"Indexed {len(index)} rows x {index.X.shape[1]} features → models/neighbors_*.npy")
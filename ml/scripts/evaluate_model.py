@@ -0,0 +1,33 @@
+# scripts/evaluate_model.py
+# Score the test split once and write metrics/report files with bootstrap CIs.
+import sys
+import argparse
+sys.path.insert(0, ".")
+import joblib
+import numpy as np
+from src.predict import MODEL_PATH
+from src.evaluation import SPLITS_DIR, evaluate
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=str(MODEL_PATH))
+    parser.add_argument("--resamples", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--no-plots", action="store_true")
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    X_test = np.load(f"{SPLITS_DIR}/X_test_scaled.npy")
+    y_test = np.load(f"{SPLITS_DIR}/y_test.npy")
+
+    point, ci = evaluate(
+        model, X_test, y_test,
+        n_resamples=args.resamples, alpha=args.alpha, workers=args.workers,
+        plots_dir=None if args.no_plots else "outputs/plots",
+    )
+
+    lo, hi = ci["macro_recall"]
+    print(f"Accuracy:     {point['accuracy']:.4f}")
+    print(f"Macro recall: {point['macro_recall']:.4f}  [{lo:.4f}, {hi:.4f}]")
+    print("Wrote outputs/reports/metrics.json, classification_report.txt, recall_report.txt")
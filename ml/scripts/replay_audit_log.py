@@ -0,0 +1,19 @@
+# scripts/replay_audit_log.py
+# Re-score logged requests through the batch scorer and report agreement.
+import sys
+sys.path.insert(0, ".")
+from src.scaling_bridge import ScalingBridge
+from src.predict import ModelPredictor
+from src.audit_log import read_audit, replay
+
+path = sys.argv[1] if len(sys.argv) > 1 else "outputs/audit"
+table = read_audit(path)
+if table is None:
+    print("No audit records found in", path)
+    sys.exit(1)
+
+result = replay(table, ScalingBridge(), ModelPredictor())
+versions = sorted(set(table.column("model_version").to_pylist()))
+print("Records:", result["rows"])
+print("Logged model versions:", versions)
+print("Agreement with current model:", result["agreement"])
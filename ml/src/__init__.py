@@ -1,3 +1,14 @@
-from .scaling_bridge import ScalingBridge
-from .predict import ModelPredictor
-from .explainability import ExplainabilityEngine
+# Components load on first access, so importing one submodule (e.g.
+# src.scaling_bridge) does not pull in SHAP and the rest of the stack.
+_EXPORTS = {
+    "ScalingBridge": ".scaling_bridge",
+    "ModelPredictor": ".predict",
+    "ExplainabilityEngine": ".explainability",
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        from importlib import import_module
+        return getattr(import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,218 @@
+# src/admission.py
+
+import math
+import time
+import asyncio
+from collections import deque
+
+from starlette.responses import JSONResponse
+
+LANES = ("interactive", "bulk")
+
+
+class Rejected(Exception):
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded in-flight limit with two priority lanes and deadline-aware
+    queueing, evaluated on the event loop before a request reaches the
+    threadpool.
+
+    - at most `max_in_flight` requests run at once; bulk work may hold at
+      most `max_bulk_in_flight` of those slots so interactive requests
+      always have headroom
+    - waiting requests queue per lane (bounded); interactive is served first
+    - a request whose remaining budget cannot cover one EWMA service time
+      (including an already-expired one) is shed, both on arrival and when
+      a queued request reaches the front; one whose estimated wait (EWMA
+      service time x queue position / lane capacity) already exceeds its
+      deadline is rejected immediately, and one whose deadline passes
+      while queued is dropped, instead of being run late
+    - queue full → 429, cannot meet deadline → 503, both with Retry-After
+    """
+
+    def __init__(self, max_in_flight=8, max_bulk_in_flight=None,
+                 max_queue=None, default_deadline_ms=30000):
+        self.max_in_flight = max_in_flight
+        self.max_bulk_in_flight = max_bulk_in_flight or max(1, max_in_flight // 2)
+        self.max_queue = max_queue or {"interactive": 64, "bulk": 16}
+        self.default_deadline_ms = default_deadline_ms
+
+        self.in_flight = {lane: 0 for lane in LANES}
+        self.queues = {lane: deque() for lane in LANES}
+        self.ewma_ms = None
+
+        self.stats = {
+            lane: {"admitted": 0, "queued": 0, "shed_queue_full": 0,
+                   "shed_deadline": 0, "expired_in_queue": 0}
+            for lane in LANES
+        }
+
+    # -----------------------------------------------------
+    # Slot accounting (event loop only, no locking needed)
+    # -----------------------------------------------------
+    def _total_in_flight(self):
+        return sum(self.in_flight.values())
+
+    def _has_slot(self, lane):
+        if self._total_in_flight() >= self.max_in_flight:
+            return False
+        return lane != "bulk" or self.in_flight["bulk"] < self.max_bulk_in_flight
+
+    def _estimated_wait_ms(self, lane):
+        ahead = len(self.queues["interactive"])
+        capacity = self.max_in_flight
+        if lane == "bulk":
+            ahead += len(self.queues["bulk"])
+            capacity = self.max_bulk_in_flight
+        service = self.ewma_ms or 0.0
+        return service * (ahead + 1) / capacity
+
+    def _too_late(self, deadline):
+        """True when the remaining budget cannot cover one service time."""
+        remaining_ms = (deadline - time.monotonic()) * 1000.0
+        return remaining_ms <= 0 or remaining_ms < (self.ewma_ms or 0.0)
+
+    def _retry_after(self, lane):
+        return max(1, math.ceil(self._estimated_wait_ms(lane) / 1000.0))
+
+    async def acquire(self, lane, deadline):
+        stats = self.stats[lane]
+
+        if self._too_late(deadline):
+            stats["shed_deadline"] += 1
+            raise Rejected(503, "deadline cannot be met", self._retry_after(lane))
+
+        if self._has_slot(lane) and not self.queues["interactive"] and \
+                (lane == "interactive" or not self.queues["bulk"]):
+            self.in_flight[lane] += 1
+            stats["admitted"] += 1
+            return
+
+        if len(self.queues[lane]) >= self.max_queue[lane]:
+            stats["shed_queue_full"] += 1
+            raise Rejected(429, "queue full", self._retry_after(lane))
+
+        remaining_ms = (deadline - time.monotonic()) * 1000.0
+        if self._estimated_wait_ms(lane) >= remaining_ms:
+            stats["shed_deadline"] += 1
+            raise Rejected(503, "deadline cannot be met", self._retry_after(lane))
+
+        fut = asyncio.get_running_loop().create_future()
+        entry = (fut, deadline)
+        self.queues[lane].append(entry)
+        stats["queued"] += 1
+
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=max(remaining_ms, 0) / 1000.0)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            shed = None
+            if not fut.done():
+                fut.cancel()
+                self.queues[lane].remove(entry)
+            elif fut.exception() is None:
+                # slot was granted just as we gave up: hand it back
+                self.release(lane, None)
+            else:
+                shed = fut.exception()  # _dispatch shed it and counted it
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            if shed is not None:
+                raise shed
+            stats["expired_in_queue"] += 1
+            raise Rejected(503, "deadline expired while queued", self._retry_after(lane))
+
+        stats["admitted"] += 1
+
+    def release(self, lane, elapsed_ms):
+        self.in_flight[lane] -= 1
+        if elapsed_ms is not None:
+            self.ewma_ms = elapsed_ms if self.ewma_ms is None else 0.8 * self.ewma_ms + 0.2 * elapsed_ms
+        self._dispatch()
+
+    def _dispatch(self):
+        for lane in LANES:
+            queue = self.queues[lane]
+            while queue and self._has_slot(lane):
+                fut, deadline = queue.popleft()
+                if fut.done():
+                    continue
+                if self._too_late(deadline):
+                    # would only finish after its deadline: shed it now
+                    self.stats[lane]["expired_in_queue"] += 1
+                    fut.set_exception(Rejected(503, "deadline cannot be met", self._retry_after(lane)))
+                    continue
+                self.in_flight[lane] += 1
+                fut.set_result(True)
+
+    def report(self):
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_bulk_in_flight": self.max_bulk_in_flight,
+            "in_flight": dict(self.in_flight),
+            "queue_depth": {lane: len(q) for lane, q in self.queues.items()},
+            "ewma_service_ms": self.ewma_ms,
+            "lanes": self.stats,
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware gating the given path prefixes.
+
+    Headers:
+      X-Priority: interactive | bulk   (default: bulk for /predict/batch,
+                                        interactive otherwise)
+      X-Deadline-Ms: time budget for this request, in milliseconds
+                     (non-numeric or non-finite → default; <= 0 → shed)
+    """
+
+    def __init__(self, app, controller, paths=("/predict",), bulk_paths=("/predict/batch",)):
+        self.app = app
+        self.controller = controller
+        self.paths = paths
+        self.bulk_paths = bulk_paths
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or scope.get("method") == "OPTIONS" or \
+                not path.startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        lane = headers.get("x-priority", "bulk" if path.startswith(self.bulk_paths) else "interactive")
+        if lane not in LANES:
+            lane = "interactive"
+
+        try:
+            budget_ms = float(headers.get("x-deadline-ms", self.controller.default_deadline_ms))
+        except ValueError:
+            budget_ms = self.controller.default_deadline_ms
+        if not math.isfinite(budget_ms):
+            # nan/inf would leave a queued request waiting without limit
+            budget_ms = self.controller.default_deadline_ms
+        deadline = time.monotonic() + budget_ms / 1000.0
+
+        try:
+            await self.controller.acquire(lane, deadline)
+        except Rejected as e:
+            response = JSONResponse(
+                {"detail": f"Overloaded: {e.reason}", "lane": lane},
+                status_code=e.status,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(lane, (time.monotonic() - start) * 1000.0)
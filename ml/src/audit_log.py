@@ -0,0 +1,294 @@
+# src/audit_log.py
+
+import os
+import glob
+import time
+import threading
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+AUDIT_DIR = "outputs/audit"
+
+
+class AuditLog:
+    """
+    Non-blocking prediction audit trail.
+
+    Requests copy fixed-width records into a preallocated ring buffer and
+    return immediately. A background thread drains the buffer in batches
+    (every `flush_rows` records or `flush_interval` seconds, whichever comes
+    first) and appends them as Arrow record batches to rotated stream files
+    (`audit-<timestamp>-<pid>-<seq>.arrows`, so several server processes can
+    share one directory).
+
+    When the buffer is full (disk slower than traffic) new records are
+    dropped and counted instead of blocking the request; rows lost to a
+    failed write are counted under `dropped` too.
+    """
+
+    def __init__(self, feature_order, class_names, out_dir=AUDIT_DIR,
+                 capacity=65536, flush_rows=1024, flush_interval=1.0,
+                 rotate_rows=1_000_000):
+        self.feature_order = list(feature_order)
+        self.class_names = list(class_names)
+        self._class_index = {c: i for i, c in enumerate(self.class_names)}
+        self._feature_index = {f: i for i, f in enumerate(self.feature_order)}
+
+        self.out_dir = out_dir
+        self.capacity = capacity
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.rotate_rows = rotate_rows
+
+        self.dtype = np.dtype([
+            ("ts", "f8"),
+            ("model_version", "S16"),
+            ("features", "f8", (len(self.feature_order),)),
+            ("probs", "f8", (len(self.class_names),)),
+            ("prediction", "i2"),
+            ("top_feature", "i2"),
+            ("top_shap", "f8"),
+        ])
+        self._buf = np.zeros(capacity, dtype=self.dtype)
+        self._head = 0
+        self._pending = 0
+
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+        self._writer = None
+        self._sink = None
+        self._file_rows = 0
+        self._file_seq = 0
+        self.schema = self._build_schema()
+
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "write_errors": 0,
+            "high_watermark": 0,
+            "last_flush_ms": 0.0,
+            "files": 0,
+        }
+
+    # -----------------------------------------------------
+    # Schema
+    # -----------------------------------------------------
+    def _build_schema(self):
+        fields = [
+            pa.field("ts", pa.timestamp("ms")),
+            pa.field("model_version", pa.string()),
+            pa.field("prediction", pa.string()),
+        ]
+        fields += [pa.field(f"prob_{c}", pa.float64()) for c in self.class_names]
+        fields += [pa.field("top_feature", pa.string()), pa.field("top_shap", pa.float64())]
+        fields += [pa.field(f, pa.float64()) for f in self.feature_order]
+        return pa.schema(fields)
+
+    def _to_batch(self, rec):
+        names = np.array(self.class_names + [None], dtype=object)
+        feats = np.array(self.feature_order + [None], dtype=object)
+
+        cols = [
+            pa.array((rec["ts"] * 1000).astype(np.int64), type=pa.timestamp("ms")),
+            pa.array(np.char.decode(rec["model_version"]).tolist(), type=pa.string()),
+            pa.array(names[rec["prediction"]].tolist(), type=pa.string()),
+        ]
+        cols += [pa.array(rec["probs"][:, i]) for i in range(len(self.class_names))]
+        cols += [
+            pa.array(feats[rec["top_feature"]].tolist(), type=pa.string()),
+            pa.array(rec["top_shap"]),
+        ]
+        cols += [pa.array(rec["features"][:, i]) for i in range(len(self.feature_order))]
+        return pa.RecordBatch.from_arrays(cols, schema=self.schema)
+
+    # -----------------------------------------------------
+    # Producer side (request threads)
+    # -----------------------------------------------------
+    def submit(self, features, probs, predictions, model_version="",
+               top_features=None, top_shap=None):
+        """
+        Enqueue one record per row. Never blocks on disk.
+
+        features: (n_rows x n_features) raw inputs in feature_order
+        probs: (n_rows x n_classes)
+        predictions: predicted label per row
+        top_features / top_shap: strongest SHAP attribution per row (optional)
+
+        Returns the number of rows accepted.
+        """
+        features = np.atleast_2d(np.asarray(features, dtype=float))
+        probs = np.atleast_2d(np.asarray(probs, dtype=float))
+        n = features.shape[0]
+
+        pred_idx = np.array([self._class_index.get(p, -1) for p in predictions], dtype=np.int16)
+        if top_features is None:
+            top_idx = np.full(n, -1, dtype=np.int16)
+            top_val = np.full(n, np.nan)
+        else:
+            top_idx = np.array([self._feature_index.get(f, -1) for f in top_features], dtype=np.int16)
+            top_val = np.asarray(top_shap, dtype=float)
+
+        now = time.time()
+        version = str(model_version).encode()[:16]
+
+        with self._cond:
+            take = min(n, self.capacity - self._pending)
+            self.stats["enqueued"] += take
+            self.stats["dropped"] += n - take
+            if take == 0:
+                return 0
+
+            slots = (self._head + np.arange(take)) % self.capacity
+            buf = self._buf
+            buf["ts"][slots] = now
+            buf["model_version"][slots] = version
+            buf["features"][slots] = features[:take]
+            buf["probs"][slots] = probs[:take]
+            buf["prediction"][slots] = pred_idx[:take]
+            buf["top_feature"][slots] = top_idx[:take]
+            buf["top_shap"][slots] = top_val[:take]
+
+            self._head = (self._head + take) % self.capacity
+            self._pending += take
+            if self._pending > self.stats["high_watermark"]:
+                self.stats["high_watermark"] = self._pending
+            if self._pending >= self.flush_rows:
+                self._cond.notify()
+
+        return take
+
+    # -----------------------------------------------------
+    # Consumer side (background writer)
+    # -----------------------------------------------------
+    def start(self):
+        if self._thread is not None:
+            return self
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+        self._close_file()
+
+    def _drain(self):
+        with self._cond:
+            n = self._pending
+            if n == 0:
+                return None
+            tail = (self._head - n) % self.capacity
+            chunk = self._buf[(tail + np.arange(n)) % self.capacity]
+            self._pending = 0
+        return chunk
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or self._pending >= self.flush_rows,
+                    timeout=self.flush_interval,
+                )
+                stopping = self._stopping
+
+            chunk = self._drain()
+            if chunk is not None:
+                self._write(chunk)
+            if stopping:
+                return
+
+    def _open_file(self):
+        self._file_seq += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.out_dir, f"audit-{stamp}-{os.getpid()}-{self._file_seq:04d}.arrows")
+        self._sink = pa.OSFile(path, "wb")
+        self._writer = ipc.new_stream(self._sink, self.schema)
+        self._file_rows = 0
+        self.stats["files"] += 1
+
+    def _close_file(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+        self._writer = self._sink = None
+
+    def _write(self, chunk):
+        t0 = time.perf_counter()
+        try:
+            if self._writer is None or self._file_rows >= self.rotate_rows:
+                self._close_file()
+                self._open_file()
+            self._writer.write_batch(self._to_batch(chunk))
+            self._file_rows += len(chunk)
+            self.stats["written"] += len(chunk)
+            self.stats["flushes"] += 1
+        except Exception as e:
+            with self._cond:
+                self.stats["write_errors"] += 1
+                self.stats["dropped"] += len(chunk)
+            print("[audit] Write failed:", e)
+            self._close_file()
+        self.stats["last_flush_ms"] = (time.perf_counter() - t0) * 1000.0
+
+    def report(self):
+        with self._cond:
+            pending = self._pending
+        return {**self.stats, "pending": pending, "capacity": self.capacity}
+
+
+# -----------------------------------------------------
+# Offline reader / replay
+# -----------------------------------------------------
+def read_audit(path=AUDIT_DIR):
+    """
+    Load audit records from one .arrows file or a directory of them into a
+    single pyarrow Table. A file cut short by a crash yields the batches
+    written before the cut.
+    """
+    files = sorted(glob.glob(os.path.join(path, "*.arrows"))) if os.path.isdir(path) else [path]
+
+    batches = []
+    for f in files:
+        with pa.OSFile(f, "rb") as src:
+            try:
+                reader = ipc.open_stream(src)
+                for batch in reader:
+                    batches.append(batch)
+            except (pa.ArrowInvalid, OSError):
+                continue
+
+    if not batches:
+        return None
+    return pa.Table.from_batches(batches)
+
+
+def replay(table, scaler, predictor):
+    """
+    Re-score logged inputs through the batch path and compare against the
+    logged predictions.
+    """
+    X = np.column_stack([table.column(f).to_numpy() for f in scaler.feature_order])
+    labels, probs = predictor.predict_batch(scaler.scale_matrix(X))
+
+    logged = table.column("prediction").to_pylist()
+    agree = np.array([a == b for a, b in zip(labels, logged)])
+
+    return {
+        "rows": len(labels),
+        "agreement": float(agree.mean()) if len(agree) else None,
+        "labels": labels,
+        "probabilities": probs,
+    }
@@ -0,0 +1,72 @@
+# src/binary_format.py
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+RAW_MEDIA_TYPE = "application/octet-stream"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float64": np.dtype("<f8"),
+}
+
+
+def _permutation(columns, feature_order):
+    """Column indices that reorder `columns` into feature_order."""
+    index = {c: i for i, c in enumerate(columns)}
+    missing = [f for f in feature_order if f not in index]
+    if missing:
+        raise KeyError(missing[0])
+    return [index[f] for f in feature_order]
+
+
+def decode_raw(body, columns, dtype, feature_order):
+    """
+    Little-endian row-major matrix → (n_rows x n_features) view in
+    feature_order. The buffer is wrapped, not copied; a copy only happens
+    when the caller's column order differs from feature_order.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported dtype: {dtype} (use float32 or float64)")
+    dt = DTYPES[dtype]
+
+    n_cols = len(columns)
+    if n_cols == 0 or len(body) % (dt.itemsize * n_cols):
+        raise ValueError(f"Body of {len(body)} bytes is not a {dtype} matrix with {n_cols} columns")
+
+    X = np.frombuffer(body, dtype=dt).reshape(-1, n_cols)
+    perm = _permutation(columns, feature_order)
+    if perm == list(range(n_cols)):
+        return X
+    return X[:, perm]
+
+
+def decode_arrow(body, feature_order):
+    """Arrow IPC stream → (n_rows x n_features) matrix in feature_order."""
+    table = ipc.open_stream(pa.py_buffer(body)).read_all()
+    _permutation(table.column_names, feature_order)
+    if table.num_rows == 0:
+        return np.empty((0, len(feature_order)))
+    return np.column_stack([
+        table.column(f).to_numpy().astype(float, copy=False) for f in feature_order
+    ])
+
+
+def encode_raw(probs, dtype):
+    """Probability matrix → little-endian bytes in the request dtype."""
+    return np.ascontiguousarray(probs, dtype=DTYPES[dtype]).tobytes()
+
+
+def encode_arrow(labels, probs, class_names):
+    """Predictions + per-class probabilities → Arrow IPC stream bytes."""
+    probs = np.asarray(probs, dtype=float).reshape(len(labels), len(class_names))
+    arrays = [pa.array(labels, type=pa.string())]
+    arrays += [pa.array(probs[:, i]) for i in range(len(class_names))]
+    batch = pa.RecordBatch.from_arrays(arrays, names=["prediction"] + list(class_names))
+
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
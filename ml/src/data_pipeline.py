@@ -0,0 +1,366 @@
+# src/data_pipeline.py
+
+import os
+import glob
+import json
+import math
+import shutil
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+RAW_GLOB = "data/raw/*.csv"
+CACHE_DIR = "data/processed"
+META_DIR = "metadata"
+# Serving schema (ScalingBridge / the trained model). prepare_dataset
+# follows it but never writes to it; its own metadata goes to STAGING_DIR.
+FEATURE_ORDER_PATH = os.path.join(META_DIR, "feature_order.json")
+CLASS_MAP_PATH = os.path.join(META_DIR, "class_mapping.json")
+STAGING_DIR = os.path.join(META_DIR, "staging")
+
+# Memory budget per finalize worker. Partitions are sized so one worker's
+# seen-hash array (8 bytes per unique row, far less than the CSV text) and
+# a spill file fit; peak memory is about workers x this.
+PARTITION_MB = 256
+# Rows a spill worker buffers across partitions before writing files
+SPILL_ROWS = 1_000_000
+TARGET = "Disease"
+
+# Raw files disagree on naming (data1.csv uses short codes, data13.csv
+# spells them out). Everything is renamed to the short form on read.
+COLUMN_ALIASES = {
+    "disease": "Disease",
+    "label": "Disease",
+    "white blood cells": "WBC",
+    "red blood cells": "RBC",
+    "mean corpuscular volume": "MCV",
+    "mean corpuscular hemoglobin": "MCH",
+    "mean corpuscular hemoglobin concentration": "MCHC",
+    "systolic blood pressure": "SystolicBP",
+    "diastolic blood pressure": "DiastolicBP",
+    "ldl cholesterol": "LDL",
+    "hdl cholesterol": "HDL",
+    "c-reactive protein": "CRP",
+    "heart rate": "HeartRate",
+}
+
+
+def normalize_column(name):
+    name = name.strip()
+    return COLUMN_ALIASES.get(name.lower(), name)
+
+
+# -----------------------------------------------------
+# Mergeable streaming statistics
+# -----------------------------------------------------
+class QuantileSketch:
+    """
+    Compacting quantile sketch (KLL-style). Level i holds items of weight
+    2**i and never exceeds k items, so memory is O(k log n). Sketches built
+    in different processes merge by concatenating levels.
+    """
+
+    def __init__(self, k=2048, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        v = np.asarray(values, dtype=float)
+        v = v[~np.isnan(v)]
+        if v.size:
+            self.levels[0] = np.concatenate([self.levels[0], v])
+            self._compact()
+
+    def merge(self, other):
+        for i, lvl in enumerate(other.levels):
+            if i == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[i] = np.concatenate([self.levels[i], lvl])
+        self._compact()
+        return self
+
+    def _compact(self):
+        i = 0
+        while i < len(self.levels):
+            if len(self.levels[i]) > self.k:
+                buf = np.sort(self.levels[i])
+                keep = buf[-1:] if len(buf) % 2 else buf[:0]
+                buf = buf[: len(buf) - len(keep)]
+                promoted = buf[int(self._rng.integers(2))::2]
+
+                self.levels[i] = keep
+                if i + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[i + 1] = np.concatenate([self.levels[i + 1], promoted])
+            i += 1
+
+    def quantiles(self, qs):
+        vals = np.concatenate(self.levels)
+        if vals.size == 0:
+            return [None for _ in qs]
+        weights = np.concatenate([np.full(len(l), 2.0 ** i) for i, l in enumerate(self.levels)])
+        order = np.argsort(vals)
+        vals, cw = vals[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cw, np.asarray(qs) * cw[-1])
+        return [float(vals[min(j, len(vals) - 1)]) for j in idx]
+
+
+class DatasetStats:
+    """Per-feature min/max/null counts, quantile sketches and class counts."""
+
+    QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+    def __init__(self, features, target=TARGET):
+        self.features = list(features)
+        self.target = target
+        n = len(self.features)
+        self.rows = 0
+        self.mins = np.full(n, np.nan)
+        self.maxs = np.full(n, np.nan)
+        self.nulls = np.zeros(n, dtype=np.int64)
+        self.sketches = [QuantileSketch() for _ in range(n)]
+        self.class_counts = Counter()
+
+    def update(self, df):
+        X = df[self.features].to_numpy(dtype=float)
+        if len(X) == 0:
+            return self
+
+        self.rows += len(X)
+        self.mins = np.fmin(self.mins, np.fmin.reduce(X, axis=0))
+        self.maxs = np.fmax(self.maxs, np.fmax.reduce(X, axis=0))
+        self.nulls += np.isnan(X).sum(axis=0)
+        for i, sketch in enumerate(self.sketches):
+            sketch.update(X[:, i])
+        self.class_counts.update(df[self.target].dropna().astype(str))
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.mins = np.fmin(self.mins, other.mins)
+        self.maxs = np.fmax(self.maxs, other.maxs)
+        self.nulls += other.nulls
+        for mine, theirs in zip(self.sketches, other.sketches):
+            mine.merge(theirs)
+        self.class_counts.update(other.class_counts)
+        return self
+
+    def features_metadata(self):
+        """{"min", "max"} per feature (read by ScalingBridge) plus quantiles and null counts."""
+        meta = {}
+        for i, f in enumerate(self.features):
+            lo, hi = self.mins[i], self.maxs[i]
+            if np.isnan(lo):
+                lo, hi = 0.0, 1.0
+            if lo == hi:
+                hi += 1
+            qs = self.sketches[i].quantiles(self.QUANTILES)
+            meta[f] = {
+                "min": float(lo),
+                "max": float(hi),
+                "quantiles": {f"p{int(round(q * 100))}": v for q, v in zip(self.QUANTILES, qs)},
+                "nulls": int(self.nulls[i]),
+            }
+        return meta
+
+    def class_mapping(self):
+        """Sorted class names → {"0": name, ...} (matches train_balanced)."""
+        return {str(i): c for i, c in enumerate(sorted(self.class_counts))}
+
+
+# -----------------------------------------------------
+# Stage 1: stream raw CSV chunks into hash-partitioned spill files
+# -----------------------------------------------------
+def read_header(path):
+    return [normalize_column(c) for c in pd.read_csv(path, nrows=0).columns]
+
+
+def _spill_file(path, columns, target, spill_dir, n_partitions, chunksize, spill_rows=SPILL_ROWS):
+    raw_cols = list(pd.read_csv(path, nrows=0).columns)
+    names = [normalize_column(c) for c in raw_cols]
+    dtype = {raw: ("string" if name == target else "float64") for raw, name in zip(raw_cols, names)}
+    stem = os.path.splitext(os.path.basename(path))[0]
+
+    # Partition slices are buffered across chunks and the largest buffer is
+    # written out whenever spill_rows are held, so each spill file carries
+    # at least spill_rows / n_partitions rows (not one file per chunk per
+    # partition).
+    buffers = defaultdict(list)
+    counts = Counter()
+    seq = 0
+
+    def flush(p):
+        nonlocal seq
+        out = os.path.join(spill_dir, f"p{p:04d}", f"{stem}-{seq:06d}.parquet")
+        pd.concat(buffers.pop(p)).to_parquet(out, index=False)
+        counts.pop(p)
+        seq += 1
+
+    rows = 0
+    reader = pd.read_csv(path, chunksize=chunksize, dtype=dtype)
+    for chunk in reader:
+        chunk.columns = names
+        chunk = chunk.reindex(columns=columns)
+        chunk = chunk[chunk[target].notna()]
+        rows += len(chunk)
+
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        chunk["_hash"] = hashes
+        for p, group in chunk.groupby(hashes % n_partitions, sort=False):
+            buffers[int(p)].append(group)
+            counts[int(p)] += len(group)
+
+        while sum(counts.values()) > spill_rows:
+            flush(max(counts, key=counts.get))
+
+    for p in list(buffers):
+        flush(p)
+
+    return rows
+
+
+# -----------------------------------------------------
+# Stage 2: dedupe each partition, collect stats, write the cache
+# -----------------------------------------------------
+def _finalize_partition(p, spill_dir, out_dir, features, target):
+    """
+    Stream one partition's spill files: drop rows whose hash was already
+    seen (first occurrence wins), update stats and append the rest to
+    part-<p>.parquet. Only the sorted seen-hash array and one spill file
+    are in memory at a time.
+    """
+    part_dir = os.path.join(spill_dir, f"p{p:04d}")
+    stats = DatasetStats(features, target)
+    seen = np.empty(0, dtype=np.uint64)
+    writer = None
+
+    try:
+        for path in sorted(glob.glob(os.path.join(part_dir, "*.parquet"))):
+            df = pd.read_parquet(path)
+            h = df["_hash"].to_numpy()
+
+            _, first = np.unique(h, return_index=True)
+            first.sort()
+            df, h = df.iloc[first], h[first]
+            if len(seen):
+                pos = np.minimum(np.searchsorted(seen, h), len(seen) - 1)
+                new = seen[pos] != h
+                df, h = df[new], h[new]
+            if not len(df):
+                continue
+
+            seen = np.sort(np.concatenate([seen, h]), kind="stable")
+            df = df.drop(columns="_hash")
+            stats.update(df)
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(os.path.join(out_dir, f"part-{p:04d}.parquet"), table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return stats
+
+
+def prepare_dataset(raw_paths=None, out_dir=CACHE_DIR, meta_dir=STAGING_DIR,
+                    target=TARGET, workers=None, chunksize=100_000, n_partitions=None,
+                    partition_mb=PARTITION_MB, feature_order_path=FEATURE_ORDER_PATH, class_map_path=CLASS_MAP_PATH):
+    """
+    Raw CSVs → deduplicated parquet cache + metadata, in one streaming pass.
+
+    Each CSV is read in chunks with explicit dtypes and rows are spilled to
+    n_partitions buckets by row hash, so duplicates (within and across
+    files) always land in the same bucket. Buckets are then deduplicated
+    and summarised independently by streaming their spill files, so a
+    worker holds one bucket's row hashes plus one spill file, never the
+    bucket itself. n_partitions defaults to total input size divided by
+    partition_mb, keeping that per-worker footprint within budget however
+    large the input. Per-bucket stats merge into features_metadata.json,
+    feature_order.json and class_mapping.json under meta_dir.
+
+    Features follow feature_order_path (the trained model's inputs) when it
+    exists; other raw columns are ignored and features absent from every
+    file are reported. Without it, all raw columns are used in file order.
+    meta_dir defaults to a staging directory so the serving metadata and
+    class mapping are never replaced under a trained model; labels missing
+    from class_map_path are reported.
+    """
+    raw_paths = sorted(raw_paths or glob.glob(RAW_GLOB))
+    if not raw_paths:
+        raise FileNotFoundError(f"No raw CSV files found ({RAW_GLOB})")
+
+    columns = []
+    for path in raw_paths:
+        columns += [c for c in read_header(path) if c not in columns]
+    if target not in columns:
+        raise ValueError(f"Target column '{target}' not found in {raw_paths}")
+
+    if feature_order_path and os.path.exists(feature_order_path):
+        with open(feature_order_path, "r", encoding="utf-8") as f:
+            features = json.load(f)
+        missing = [c for c in features if c not in columns]
+        if missing:
+            print("[pipeline] Features missing from every raw file:", missing)
+    else:
+        features = [c for c in columns if c != target]
+    columns = features + [target]
+
+    if n_partitions is None:
+        raw_bytes = sum(os.path.getsize(path) for path in raw_paths)
+        n_partitions = max(1, math.ceil(raw_bytes / (partition_mb * 2 ** 20)))
+
+    spill_dir = os.path.join(out_dir, "_spill")
+    shutil.rmtree(spill_dir, ignore_errors=True)
+    for old in glob.glob(os.path.join(out_dir, "part-*.parquet")):
+        os.remove(old)
+    for p in range(n_partitions):
+        os.makedirs(os.path.join(spill_dir, f"p{p:04d}"), exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        read = sum(pool.map(
+            _spill_file, raw_paths,
+            [columns] * len(raw_paths), [target] * len(raw_paths),
+            [spill_dir] * len(raw_paths), [n_partitions] * len(raw_paths),
+            [chunksize] * len(raw_paths),
+        ))
+        parts = list(pool.map(
+            _finalize_partition, range(n_partitions),
+            [spill_dir] * n_partitions, [out_dir] * n_partitions,
+            [features] * n_partitions, [target] * n_partitions,
+        ))
+
+    shutil.rmtree(spill_dir, ignore_errors=True)
+
+    stats = DatasetStats(features, target)
+    for s in parts:
+        stats.merge(s)
+
+    if class_map_path and os.path.exists(class_map_path):
+        with open(class_map_path, "r", encoding="utf-8") as f:
+            known = set(json.load(f).values())
+        unknown = sorted(set(stats.class_counts) - known)
+        if unknown:
+            print(f"[pipeline] Labels not in {class_map_path}:", unknown)
+
+    os.makedirs(meta_dir, exist_ok=True)
+    with open(os.path.join(meta_dir, "features_metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(stats.features_metadata(), f, indent=2)
+    with open(os.path.join(meta_dir, "feature_order.json"), "w", encoding="utf-8") as f:
+        json.dump(features, f, indent=2)
+    with open(os.path.join(meta_dir, "class_mapping.json"), "w", encoding="utf-8") as f:
+        json.dump(stats.class_mapping(), f, indent=2)
+
+    stats.rows_read = read
+    return stats
+
+
+def load_prepared(out_dir=CACHE_DIR):
+    """Load the cached columnar dataset written by prepare_dataset."""
+    return pd.read_parquet(sorted(glob.glob(os.path.join(out_dir, "part-*.parquet"))))
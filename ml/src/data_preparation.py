@@ -8,21 +8,28 @@ def load_raw_data(path: str) -> pd.DataFrame:
     return pd.read_csv(path)
 
 
+def _to_numeric_if_possible(col: pd.Series) -> pd.Series:
+    """pd.to_numeric(errors="ignore") without the deprecated flag"""
+    try:
+        return pd.to_numeric(col)
+    except (ValueError, TypeError):
+        return col
+
+
 def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """
     General cleaning:
     - drop duplicates
     - strip column names
-    - convert all numeric columns safely
+    - convert text columns to numeric where every value parses
     """
-    df = df.copy()
-
-    # Strip whitespace from columns
-    df.columns = [c.strip() for c in df.columns]
+    # Strip whitespace from columns (rename returns a new frame, so the
+    # caller's frame is left untouched)
+    df = df.rename(columns=lambda c: c.strip())
 
-    # Convert numerics
-    for col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors="ignore")
+    # Only object columns can need conversion
+    for col in df.select_dtypes(include="object").columns:
+        df[col] = _to_numeric_if_possible(df[col])
 
     df = df.drop_duplicates()
 
@@ -0,0 +1,216 @@
+# src/drift_monitor.py
+
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+
+REFERENCE_PATH = "data/splits/X_train_scaled.npy"
+REFERENCE_LABELS_PATH = "data/splits/y_train.npy"
+
+EPS = 1e-6
+
+
+def _dist(counts):
+    counts = np.asarray(counts, dtype=float)
+    total = np.maximum(counts.sum(axis=-1, keepdims=True), 1.0)
+    return np.clip(counts / total, EPS, None)
+
+
+def _psi(expected, actual):
+    """Population stability index between two count vectors (last axis)."""
+    e, a = _dist(expected), _dist(actual)
+    return np.sum((a - e) * np.log(a / e), axis=-1)
+
+
+def _kl(expected, actual):
+    """KL(actual || expected) between two count vectors (last axis)."""
+    e, a = _dist(expected), _dist(actual)
+    return np.sum(a * np.log(a / e), axis=-1)
+
+
+class DriftMonitor:
+    """
+    Streaming drift sketches over live scaled inputs and predicted labels.
+
+    Memory is fixed by (n_features x fine_bins); every update is a handful of
+    vectorised NumPy ops on the incoming rows, so the cost per row is O(1)
+    regardless of how many rows have been seen.
+
+    - fine histogram over the scaled [0, 1] range (also used as a quantile
+      sketch: quantile error is bounded by 1 / fine_bins)
+    - coarse histogram (fine bins summed) for PSI / KL against the reference
+    - below-min / above-max clip counters, taken before ScalingBridge clips
+    - class-frequency counter over predicted labels
+    """
+
+    def __init__(self, feature_order, psi_bins=10, fine_bins=1000):
+        if fine_bins % psi_bins:
+            raise ValueError("fine_bins must be a multiple of psi_bins")
+
+        self.feature_order = list(feature_order)
+        self.psi_bins = psi_bins
+        self.fine_bins = fine_bins
+
+        n = len(self.feature_order)
+        self._lock = threading.Lock()
+        self._hist = np.zeros((n, fine_bins), dtype=np.int64)
+        self._below = np.zeros(n, dtype=np.int64)
+        self._above = np.zeros(n, dtype=np.int64)
+        self._classes = Counter()
+        self._rows = 0
+
+        self.ref_hist = None
+        self.ref_classes = None
+
+    # -----------------------------------------------------
+    # Reference distribution
+    # -----------------------------------------------------
+    def set_reference(self, X_ref, labels=None):
+        X_ref = np.asarray(X_ref, dtype=float)
+        if X_ref.ndim != 2 or X_ref.shape[1] != len(self.feature_order):
+            raise ValueError(
+                f"Reference must be (n_rows x {len(self.feature_order)}), got {X_ref.shape}"
+            )
+        X_ref = np.nan_to_num(np.clip(X_ref, 0.0, 1.0), nan=0.0)
+        self.ref_hist = self._bin_counts(X_ref, self.psi_bins)
+        if labels is not None:
+            self.ref_classes = Counter(labels)
+
+    @classmethod
+    def from_reference(cls, feature_order, path=REFERENCE_PATH,
+                       labels_path=REFERENCE_LABELS_PATH, label_map=None, **kwargs):
+        """
+        Build a monitor whose reference is the scaled training split.
+        Missing files leave the monitor running without a reference.
+        """
+        monitor = cls(feature_order, **kwargs)
+
+        if os.path.exists(path):
+            X_ref = np.load(path)
+            labels = None
+            if labels_path and os.path.exists(labels_path):
+                y = np.load(labels_path, allow_pickle=True).reshape(-1)
+                label_map = label_map or {}
+                labels = [label_map.get(int(v), str(v)) for v in y]
+            monitor.set_reference(X_ref, labels)
+
+        return monitor
+
+    @staticmethod
+    def _flat_bins(X, bins):
+        """Row-major index into an (n_features x bins) histogram, per cell of X."""
+        idx = np.minimum((X * bins).astype(np.int64), bins - 1)
+        return idx + np.arange(X.shape[1]) * bins
+
+    def _bin_counts(self, X, bins):
+        flat = self._flat_bins(X, bins)
+        return np.bincount(flat.ravel(), minlength=X.shape[1] * bins).reshape(X.shape[1], bins)
+
+    # -----------------------------------------------------
+    # Hot path
+    # -----------------------------------------------------
+    def observe(self, scaled_unclipped, labels=()):
+        """
+        scaled_unclipped: (n_rows x n_features) output of
+            ScalingBridge.scale_matrix(..., clip=False)
+        labels: predicted label per row
+        """
+        X = np.asarray(scaled_unclipped, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        below = (X < 0.0).sum(axis=0)
+        above = (X > 1.0).sum(axis=0)
+        # fmax/fmin clip and send NaN to 0 in one pass
+        X = np.fmin(np.fmax(X, 0.0), 1.0)
+
+        if X.shape[0] == 1:
+            # one bin per feature, all distinct: increment them in place
+            flat = self._flat_bins(X, self.fine_bins).ravel()
+            counts = None
+        else:
+            counts = self._bin_counts(X, self.fine_bins)
+
+        with self._lock:
+            if counts is None:
+                self._hist.reshape(-1)[flat] += 1
+            else:
+                self._hist += counts
+            self._below += below
+            self._above += above
+            self._classes.update(labels)
+            self._rows += X.shape[0]
+
+    # -----------------------------------------------------
+    # Reporting
+    # -----------------------------------------------------
+    def quantiles(self, qs=(0.05, 0.5, 0.95), hist=None):
+        if hist is None:
+            with self._lock:
+                hist = self._hist.copy()
+
+        total = hist.sum(axis=1, keepdims=True)
+        cdf = np.cumsum(hist, axis=1)
+        out = {}
+        for q in qs:
+            target = np.maximum(np.ceil(q * total), 1)
+            bin_idx = (cdf < target).sum(axis=1)
+            vals = (np.minimum(bin_idx, self.fine_bins - 1) + 0.5) / self.fine_bins
+            vals[total[:, 0] == 0] = np.nan
+            out[q] = vals
+        return out
+
+    def report(self):
+        with self._lock:
+            hist = self._hist.copy()
+            below = self._below.copy()
+            above = self._above.copy()
+            classes = dict(self._classes)
+            rows = self._rows
+
+        coarse = hist.reshape(len(self.feature_order), self.psi_bins, -1).sum(axis=2)
+        quantiles = self.quantiles(hist=hist)
+
+        psi = kl = None
+        if self.ref_hist is not None and rows:
+            psi = _psi(self.ref_hist, coarse)
+            kl = _kl(self.ref_hist, coarse)
+
+        features = {}
+        for i, feat in enumerate(self.feature_order):
+            features[feat] = {
+                "below_min": int(below[i]),
+                "above_max": int(above[i]),
+                "clip_rate": float((below[i] + above[i]) / rows) if rows else 0.0,
+                "quantiles": {
+                    f"p{int(q * 100)}": (None if np.isnan(v[i]) else float(v[i]))
+                    for q, v in quantiles.items()
+                },
+                "psi": None if psi is None else float(psi[i]),
+                "kl": None if kl is None else float(kl[i]),
+            }
+
+        class_drift = None
+        if self.ref_classes and classes:
+            names = sorted(set(self.ref_classes) | set(classes))
+            ref = np.array([self.ref_classes.get(n, 0) for n in names], dtype=float)
+            live = np.array([classes.get(n, 0) for n in names], dtype=float)
+            class_drift = {"psi": float(_psi(ref, live)), "kl": float(_kl(ref, live))}
+
+        return {
+            "rows": rows,
+            "has_reference": self.ref_hist is not None,
+            "features": features,
+            "class_counts": classes,
+            "class_drift": class_drift,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._hist[:] = 0
+            self._below[:] = 0
+            self._above[:] = 0
+            self._classes.clear()
+            self._rows = 0
@@ -0,0 +1,283 @@
+# src/evaluation.py
+
+import os
+import json
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SPLITS_DIR = "data/splits"
+REPORTS_DIR = "outputs/reports"
+PLOTS_DIR = "outputs/plots"
+CLASS_MAP_PATH = "metadata/class_mapping.json"
+
+
+# -----------------------------------------------------
+# Confusion-matrix arithmetic (vectorised over resamples)
+# -----------------------------------------------------
+def confusion_matrices(codes, n_classes):
+    """
+    codes: (..., n) int array of y_true * K + y_pred
+    Returns (..., K, K) confusion matrices via a single bincount.
+    """
+    codes = np.asarray(codes)
+    lead = codes.shape[:-1]
+    m = int(np.prod(lead)) if lead else 1
+    kk = n_classes * n_classes
+    offsets = (np.arange(m) * kk).reshape(lead + (1,)) if lead else 0
+    counts = np.bincount((codes + offsets).ravel(), minlength=m * kk)
+    return counts.reshape(lead + (n_classes, n_classes))
+
+
+def metrics_from_confusion(cm, undefined=0.0):
+    """
+    cm: (..., K, K) with rows = true class, cols = predicted class.
+    Returns per-class precision/recall/f1/support and aggregate metrics,
+    each with the same leading shape as cm.
+
+    undefined: value for a class's precision (never predicted) or recall
+    (no support). 0.0 matches sklearn; bootstrap draws use NaN so such
+    resamples are left out of that class's interval instead of counting
+    as 0. Macro and weighted averages skip NaN classes.
+    """
+    cm = np.asarray(cm, dtype=float)
+    tp = np.diagonal(cm, axis1=-2, axis2=-1)
+    support = cm.sum(axis=-1)
+    predicted = cm.sum(axis=-2)
+    total = support.sum(axis=-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, undefined)
+        recall = np.where(support > 0, tp / support, undefined)
+        pr = precision + recall
+        f1 = np.where(np.isnan(pr), undefined, np.where(pr > 0, 2 * precision * recall / pr, 0.0))
+        weights = support / total[..., None]
+
+    return {
+        "precision": precision,
+        "recall": recall,
+        "f1-score": f1,
+        "support": support,
+        "accuracy": tp.sum(axis=-1) / total,
+        "macro_precision": np.nanmean(precision, axis=-1),
+        "macro_recall": np.nanmean(recall, axis=-1),
+        "macro_f1": np.nanmean(f1, axis=-1),
+        "weighted_precision": np.nansum(precision * weights, axis=-1),
+        "weighted_recall": np.nansum(recall * weights, axis=-1),
+        "weighted_f1": np.nansum(f1 * weights, axis=-1),
+    }
+
+
+def _bootstrap_block(codes, n_classes, n_resamples, seed):
+    """Worker: n_resamples bootstrap metric draws from index arrays only."""
+    rng = np.random.default_rng(seed)
+    n = len(codes)
+    block = max(1, min(256, (1 << 22) // max(n, 1)))  # keep idx under ~32 MB
+    out = []
+    for start in range(0, n_resamples, block):
+        b = min(block, n_resamples - start)
+        idx = rng.integers(0, n, size=(b, n))
+        out.append(metrics_from_confusion(confusion_matrices(codes[idx], n_classes), undefined=np.nan))
+    return {k: np.concatenate([o[k] for o in out]) for k in out[0]}
+
+
+def bootstrap(y_true, y_pred, n_classes, n_resamples=2000, workers=None, seed=42):
+    """Bootstrap metric draws, split across a process pool."""
+    codes = (np.asarray(y_true, dtype=np.int64) * n_classes + np.asarray(y_pred, dtype=np.int64))
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, n_resamples))
+
+    sizes = [len(a) for a in np.array_split(np.arange(n_resamples), workers)]
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+
+    if workers == 1:
+        parts = [_bootstrap_block(codes, n_classes, sizes[0], seeds[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(
+                _bootstrap_block,
+                [codes] * workers, [n_classes] * workers, sizes, seeds,
+            ))
+
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+def confidence_intervals(draws, alpha=0.05):
+    """Percentile intervals, ignoring draws where a metric was undefined (NaN)."""
+    lo, hi = 100 * alpha / 2, 100 * (1 - alpha / 2)
+    with warnings.catch_warnings():
+        # a class absent from every resample has an all-NaN column → NaN CI
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return {k: (np.nanpercentile(v, lo, axis=0), np.nanpercentile(v, hi, axis=0))
+                for k, v in draws.items()}
+
+
+# -----------------------------------------------------
+# Report writers
+# -----------------------------------------------------
+def _class_names(n_classes, class_map_path=CLASS_MAP_PATH):
+    mapping = {}
+    if os.path.exists(class_map_path):
+        with open(class_map_path, "r", encoding="utf-8") as f:
+            mapping = json.load(f)
+    return [str(mapping.get(str(i), i)) for i in range(n_classes)]
+
+
+def _ci(pair, i=None):
+    lo, hi = pair
+    if i is not None:
+        lo, hi = lo[i], hi[i]
+    return [float(lo), float(hi)]
+
+
+def write_reports(point, ci, class_names, n_resamples, alpha,
+                  reports_dir=REPORTS_DIR, plots_dir=PLOTS_DIR, cm=None):
+    os.makedirs(reports_dir, exist_ok=True)
+    K = len(class_names)
+    level = f"{int(round((1 - alpha) * 100))}%"
+
+    # metrics.json (same layout as before, plus confidence_intervals)
+    per_class = {}
+    for i in range(K):
+        per_class[str(i)] = {m: float(point[m][i]) for m in ("precision", "recall", "f1-score", "support")}
+    per_class["accuracy"] = float(point["accuracy"])
+    total = float(point["support"].sum())
+    per_class["macro avg"] = {
+        "precision": float(point["macro_precision"]),
+        "recall": float(point["macro_recall"]),
+        "f1-score": float(point["macro_f1"]),
+        "support": total,
+    }
+    per_class["weighted avg"] = {
+        "precision": float(point["weighted_precision"]),
+        "recall": float(point["weighted_recall"]),
+        "f1-score": float(point["weighted_f1"]),
+        "support": total,
+    }
+
+    metrics = {
+        "accuracy": float(point["accuracy"]),
+        "macro_recall": float(point["macro_recall"]),
+        "macro_f1": float(point["macro_f1"]),
+        "per_class": per_class,
+        "confidence_intervals": {
+            "level": level,
+            "n_resamples": n_resamples,
+            "accuracy": _ci(ci["accuracy"]),
+            "macro_recall": _ci(ci["macro_recall"]),
+            "macro_f1": _ci(ci["macro_f1"]),
+            "weighted_recall": _ci(ci["weighted_recall"]),
+            "per_class": {
+                str(i): {m: _ci(ci[m], i) for m in ("precision", "recall", "f1-score")}
+                for i in range(K)
+            },
+        },
+    }
+    with open(os.path.join(reports_dir, "metrics.json"), "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
+
+    # classification_report.txt (sklearn layout + CI columns)
+    width = max(12, max(len(c) for c in class_names))
+    lines = [f"{'':>{width}} {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}   recall {level} CI", ""]
+    for i, name in enumerate(class_names):
+        lo, hi = _ci(ci["recall"], i)
+        lines.append(
+            f"{name:>{width}} {point['precision'][i]:9.2f} {point['recall'][i]:9.2f} "
+            f"{point['f1-score'][i]:9.2f} {int(point['support'][i]):9d}   [{lo:.2f}, {hi:.2f}]"
+        )
+    lines.append("")
+    lo, hi = _ci(ci["accuracy"])
+    lines.append(f"{'accuracy':>{width}} {'':9} {'':9} {point['accuracy']:9.2f} {int(total):9d}   [{lo:.2f}, {hi:.2f}]")
+    for label, key in (("macro avg", "macro"), ("weighted avg", "weighted")):
+        lo, hi = _ci(ci[f"{key}_recall"])
+        lines.append(
+            f"{label:>{width}} {point[key + '_precision']:9.2f} {point[key + '_recall']:9.2f} "
+            f"{point[key + '_f1']:9.2f} {int(total):9d}   [{lo:.2f}, {hi:.2f}]"
+        )
+    with open(os.path.join(reports_dir, "classification_report.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    # recall_report.txt
+    bar = "=" * 80
+    lines = [bar, "RECALL ANALYSIS REPORT (PRIMARY METRIC)", bar, ""]
+    lo, hi = _ci(ci["macro_recall"])
+    lines.append(f"Macro Recall:    {point['macro_recall']:.4f}  ({level} CI {lo:.4f} - {hi:.4f})")
+    lo, hi = _ci(ci["weighted_recall"])
+    lines.append(f"Weighted Recall: {point['weighted_recall']:.4f}  ({level} CI {lo:.4f} - {hi:.4f})")
+    lines += ["", "Per-Class Recall:", "-" * 80]
+    for i, name in enumerate(class_names):
+        lo, hi = _ci(ci["recall"], i)
+        lines.append(f"{name:<25}: {point['recall'][i]:.4f}  ({level} CI {lo:.4f} - {hi:.4f})")
+    lines.append(f"\nBootstrap resamples: {n_resamples}")
+    with open(os.path.join(reports_dir, "recall_report.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    # plots
+    if plots_dir and cm is not None:
+        _write_plots(cm, point, ci, class_names, plots_dir)
+
+
+def _write_plots(cm, point, ci, class_names, plots_dir):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    os.makedirs(plots_dir, exist_ok=True)
+    K = len(class_names)
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    im = ax.imshow(cm, cmap="Blues")
+    ax.set_xticks(range(K), class_names, rotation=45, ha="right")
+    ax.set_yticks(range(K), class_names)
+    ax.set_xlabel("Predicted")
+    ax.set_ylabel("True")
+    for i in range(K):
+        for j in range(K):
+            ax.text(j, i, int(cm[i, j]), ha="center", va="center")
+    fig.colorbar(im, ax=ax)
+    ax.set_title("Confusion Matrix")
+    fig.tight_layout()
+    fig.savefig(os.path.join(plots_dir, "confusion_matrix.png"), dpi=120)
+    plt.close(fig)
+
+    lo, hi = ci["recall"]
+    rec = point["recall"]
+    fig, ax = plt.subplots(figsize=(8, 5))
+    # a percentile interval need not contain the point estimate
+    yerr = np.nan_to_num(np.maximum([rec - lo, hi - rec], 0.0))
+    ax.bar(range(K), rec, yerr=yerr, capsize=4)
+    ax.set_xticks(range(K), class_names, rotation=45, ha="right")
+    ax.set_ylim(0, 1.05)
+    ax.set_ylabel("Recall")
+    ax.set_title("Recall per Class (bootstrap CI)")
+    fig.tight_layout()
+    fig.savefig(os.path.join(plots_dir, "recall_per_class.png"), dpi=120)
+    plt.close(fig)
+
+
+# -----------------------------------------------------
+# Entry point
+# -----------------------------------------------------
+def evaluate(model, X_test, y_test, n_resamples=2000, alpha=0.05, workers=None,
+             reports_dir=REPORTS_DIR, plots_dir=PLOTS_DIR, class_map_path=CLASS_MAP_PATH):
+    """
+    Score the test split once, then derive point metrics and bootstrap
+    confidence intervals from the (y_true, y_pred) index arrays alone.
+    """
+    y_true = np.asarray(y_test).reshape(-1).astype(np.int64)
+    y_pred = np.asarray(model.predict(np.asarray(X_test, dtype=float))).reshape(-1).astype(np.int64)
+
+    n_classes = int(max(y_true.max(), y_pred.max())) + 1
+    classes = getattr(model, "classes_", None)
+    if classes is not None:
+        n_classes = max(n_classes, len(classes))
+
+    cm = confusion_matrices(y_true * n_classes + y_pred, n_classes)
+    point = metrics_from_confusion(cm)
+    draws = bootstrap(y_true, y_pred, n_classes, n_resamples=n_resamples, workers=workers)
+    ci = confidence_intervals(draws, alpha)
+
+    write_reports(point, ci, _class_names(n_classes, class_map_path), n_resamples, alpha,
+                  reports_dir=reports_dir, plots_dir=plots_dir, cm=cm)
+    return point, ci
@@ -0,0 +1,333 @@
+# src/explain_pool.py
+
+import time
+import queue
+import threading
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import numpy as np
+
+
+def _worker_main(worker_id, generation, model_path, feature_names, inputs_buf,
+                 outputs_buf, n_slots, tasks, results):
+    """
+    Worker process: load model + explainer once, warm up, then explain
+    slots. Only slot numbers travel over the queues; feature vectors and
+    SHAP values live in the shared buffers.
+
+    Messages are (worker_id, generation, slot, error, elapsed_ms); slot is
+    None for the warm-up report.
+    """
+    import joblib
+    from src.explainability import ExplainabilityEngine
+
+    n = len(feature_names)
+    inputs = np.frombuffer(inputs_buf, dtype=np.float64).reshape(n_slots, n)
+    outputs = np.frombuffer(outputs_buf, dtype=np.float64).reshape(n_slots, n)
+
+    # the explainer is built lazily on first use, so run one explanation
+    # now rather than on the first request routed here
+    t0 = time.perf_counter()
+    try:
+        engine = ExplainabilityEngine(joblib.load(model_path), feature_names)
+        engine.compute_array(np.zeros((1, n)))
+    except Exception as e:
+        results.put((worker_id, generation, None, repr(e), (time.perf_counter() - t0) * 1000.0))
+        return
+    results.put((worker_id, generation, None, None, (time.perf_counter() - t0) * 1000.0))
+
+    while True:
+        slot = tasks.get()
+        if slot is None:
+            return
+
+        t0 = time.perf_counter()
+        try:
+            vec = np.asarray(engine.compute_array(inputs[slot:slot + 1]), dtype=np.float64).ravel()
+            outputs[slot, :] = 0.0
+            outputs[slot, :min(n, vec.size)] = vec[:n]
+            results.put((worker_id, generation, slot, None, (time.perf_counter() - t0) * 1000.0))
+        except Exception as e:
+            results.put((worker_id, generation, slot, repr(e), (time.perf_counter() - t0) * 1000.0))
+
+
+class ExplainQueueFull(Exception):
+    pass
+
+
+class ExplainTimeout(Exception):
+    pass
+
+
+class ExplainUnavailable(Exception):
+    pass
+
+
+class ExplanationPool:
+    """
+    SHAP computation in a pool of worker processes (sidesteps the GIL).
+
+    Each worker loads the model, builds the explainer and runs one warm-up
+    explanation before reporting ready. The parent owns `queue_len` slots in
+    two shared float64 buffers (inputs and outputs, one row per slot); a
+    request claims a free slot, writes its raw feature vector in place and
+    sends only the slot number to the least-loaded worker's queue. A
+    listener thread resolves the waiting future when the worker reports.
+
+    The listener also watches the workers: when one dies, the slots it held
+    are failed (ExplainUnavailable) or reclaimed and a replacement is
+    started. A worker that dies before ever becoming ready is restarted at
+    most `max_restarts` times in a row.
+
+    When every slot is taken, callers wait up to `submit_timeout` seconds
+    and then get ExplainQueueFull; a task running past `task_timeout` gives
+    ExplainTimeout.
+
+    compute_and_return matches ExplainabilityEngine, so the pool is a
+    drop-in replacement for the in-process engine.
+    """
+
+    def __init__(self, model_path, feature_names, workers=2, queue_len=64,
+                 submit_timeout=1.0, task_timeout=30.0, max_restarts=3,
+                 check_interval=0.5):
+        self.model_path = str(model_path)
+        self.feature_names = list(feature_names)
+        self.workers = workers
+        self.queue_len = queue_len
+        self.submit_timeout = submit_timeout
+        self.task_timeout = task_timeout
+        self.max_restarts = max_restarts
+        self.check_interval = check_interval
+
+        n = len(self.feature_names)
+        self._ctx = mp.get_context("spawn")
+        self._inputs_buf = self._ctx.RawArray("d", queue_len * n)
+        self._outputs_buf = self._ctx.RawArray("d", queue_len * n)
+        self._inputs = np.frombuffer(self._inputs_buf, dtype=np.float64).reshape(queue_len, n)
+        self._outputs = np.frombuffer(self._outputs_buf, dtype=np.float64).reshape(queue_len, n)
+
+        self._results = self._ctx.Queue()
+        self._free = queue.Queue()
+        for slot in range(queue_len):
+            self._free.put(slot)
+        self._futures = {}
+        self._assigned = {}             # slot -> (worker_id, generation)
+        self._lock = threading.Lock()
+        self._ready_event = threading.Event()
+        self._closing = False
+
+        self._latencies = deque(maxlen=1024)
+        self._warmup_ms = [None] * workers
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+                      "timed_out": 0, "restarts": 0}
+
+        self._procs = [None] * workers
+        self._queues = [None] * workers
+        self._generation = [0] * workers
+        self._ready = [False] * workers
+        self._load = [0] * workers
+        self._failed_starts = [0] * workers
+        for i in range(workers):
+            self._start_worker(i)
+
+        self._listener = threading.Thread(target=self._listen, name="explain-results", daemon=True)
+        self._listener.start()
+
+    def _start_worker(self, i):
+        self._generation[i] += 1
+        self._queues[i] = self._ctx.Queue()
+        self._ready[i] = False
+        self._load[i] = 0
+        self._procs[i] = self._ctx.Process(
+            target=_worker_main,
+            args=(i, self._generation[i], self.model_path, self.feature_names,
+                  self._inputs_buf, self._outputs_buf, self.queue_len,
+                  self._queues[i], self._results),
+            name=f"explain-worker-{i}",
+            daemon=True,
+        )
+        self._procs[i].start()
+
+    def wait_ready(self, timeout=None):
+        """Block until at least one worker has warmed up. Returns True if so."""
+        return self._ready_event.wait(timeout)
+
+    # -----------------------------------------------------
+    # Result listener / supervisor
+    # -----------------------------------------------------
+    def _listen(self):
+        last_check = time.monotonic()
+        while True:
+            try:
+                msg = self._results.get(timeout=self.check_interval)
+            except queue.Empty:
+                msg = ()
+            if msg is None:
+                return
+            if msg:
+                self._handle(*msg)
+
+            if time.monotonic() - last_check >= self.check_interval:
+                self._reap()
+                last_check = time.monotonic()
+
+    def _handle(self, worker_id, generation, slot, error, elapsed_ms):
+        if slot is None:
+            with self._lock:
+                if generation != self._generation[worker_id]:
+                    return
+                if error:
+                    print(f"[explain_pool] worker {worker_id} failed to start:", error)
+                    return
+                self._ready[worker_id] = True
+                self._failed_starts[worker_id] = 0
+                self._warmup_ms[worker_id] = elapsed_ms
+            self._ready_event.set()
+            return
+
+        with self._lock:
+            if self._assigned.get(slot) != (worker_id, generation):
+                # slot was already reclaimed from a dead worker
+                return
+            del self._assigned[slot]
+            self._load[worker_id] -= 1
+            fut = self._futures.pop(slot, None)
+            self._latencies.append(elapsed_ms)
+            self.stats["failed" if error else "completed"] += 1
+
+        if fut is None:
+            # caller already timed out; slot can be reused now
+            self._free.put(slot)
+        elif error:
+            fut.set_exception(RuntimeError(f"SHAP worker failed: {error}"))
+        else:
+            fut.set_result(self._outputs[slot].copy())
+
+    def _reap(self):
+        """Fail or reclaim the slots of dead workers and start replacements."""
+        for i, proc in enumerate(self._procs):
+            if self._closing or proc is None or proc.is_alive():
+                continue
+
+            with self._lock:
+                lost = [s for s, (w, _) in self._assigned.items() if w == i]
+                orphaned = []
+                waiting = []
+                for s in lost:
+                    del self._assigned[s]
+                    fut = self._futures.pop(s, None)
+                    (orphaned if fut is None else waiting).append((s, fut))
+                self.stats["failed"] += len(lost)
+                was_ready = self._ready[i]
+
+                if not was_ready:
+                    self._failed_starts[i] += 1
+                if self._failed_starts[i] > self.max_restarts:
+                    self._procs[i] = None
+                    print(f"[explain_pool] worker {i} keeps failing to start; not restarting")
+                else:
+                    self.stats["restarts"] += 1
+                    self._start_worker(i)
+
+            print(f"[explain_pool] worker {i} exited (code {proc.exitcode}); "
+                  f"{len(lost)} task(s) lost")
+            for s, _ in orphaned:
+                self._free.put(s)
+            for _, fut in waiting:
+                # the caller frees the slot when it sees the exception
+                fut.set_exception(ExplainUnavailable(f"SHAP worker {i} exited"))
+
+    # -----------------------------------------------------
+    # Public API
+    # -----------------------------------------------------
+    def _pick_worker(self):
+        """Least-loaded ready worker, else least-loaded live one (under lock)."""
+        live = [i for i, p in enumerate(self._procs) if p is not None and p.is_alive()]
+        if not live:
+            return None
+        ready = [i for i in live if self._ready[i]] or live
+        return min(ready, key=lambda i: self._load[i])
+
+    def compute_array(self, X):
+        """1xN raw vector in feature_names order → 1-D SHAP vector"""
+        with self._lock:
+            if self._pick_worker() is None:
+                raise ExplainUnavailable("No SHAP worker processes are running")
+
+        try:
+            slot = self._free.get(timeout=self.submit_timeout)
+        except queue.Empty:
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise ExplainQueueFull(f"All {self.queue_len} explanation slots busy")
+
+        fut = Future()
+        self._inputs[slot, :] = np.asarray(X, dtype=np.float64).reshape(-1)
+        with self._lock:
+            w = self._pick_worker()
+            if w is None:
+                self._free.put(slot)
+                raise ExplainUnavailable("No SHAP worker processes are running")
+            self._futures[slot] = fut
+            self._assigned[slot] = (w, self._generation[w])
+            self._load[w] += 1
+            tasks = self._queues[w]
+            self.stats["submitted"] += 1
+        tasks.put(slot)
+
+        try:
+            vec = fut.result(timeout=self.task_timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.stats["timed_out"] += 1
+                # while still pending the listener frees the slot once the
+                # worker reports back (or dies); otherwise it finished just now
+                finished = self._futures.pop(slot, None) is None
+            if finished:
+                self._free.put(slot)
+            raise ExplainTimeout(f"SHAP explanation took longer than {self.task_timeout:g}s")
+        except Exception:
+            self._free.put(slot)
+            raise
+        self._free.put(slot)
+        return vec
+
+    def compute_and_return(self, raw_input_dict):
+        X = np.array([[raw_input_dict[f] for f in self.feature_names]], dtype=float)
+        vec = self.compute_array(X)
+        return {f: float(vec[i]) for i, f in enumerate(self.feature_names)}
+
+    def report(self):
+        with self._lock:
+            lat = np.array(self._latencies) if self._latencies else None
+            stats = dict(self.stats)
+            pending = len(self._futures)
+            ready = sum(self._ready)
+            warmup = list(self._warmup_ms)
+        return {
+            **stats,
+            "workers": self.workers,
+            "alive_workers": sum(p is not None and p.is_alive() for p in self._procs),
+            "ready_workers": ready,
+            "warmup_ms": warmup,
+            "queue_len": self.queue_len,
+            "in_flight": pending,
+            "latency_ms": None if lat is None else {
+                "p50": float(np.percentile(lat, 50)),
+                "p95": float(np.percentile(lat, 95)),
+                "max": float(lat.max()),
+            },
+        }
+
+    def close(self):
+        self._closing = True
+        for p, tasks in zip(self._procs, self._queues):
+            if p is not None:
+                tasks.put(None)
+        for p in self._procs:
+            if p is not None:
+                p.join(timeout=5)
+        self._results.put(None)
+        self._listener.join(timeout=5)
@@ -39,6 +39,24 @@ class ExplainabilityEngine:
         # Convert dict → 1xN ordered vector
         X = np.array([[raw_input_dict[f] for f in self.feature_names]], dtype=float)
 
+        vec = self.compute_array(X)
+
+        # Convert array → dict, safe-cast to float
+        out = {}
+        for i, fname in enumerate(self.feature_names):
+            try:
+                out[fname] = float(vec[i])
+            except Exception:
+                out[fname] = 0.0
+
+        return out
+
+    def compute_array(self, X):
+        """
+        X = 1xN raw vector in feature_names order
+        Returns 1-D SHAP vector (length N)
+        """
+
         # Initialize explainer first time
         if self.explainer is None:
             self._init_explainer(X)
@@ -72,12 +90,4 @@ class ExplainabilityEngine:
             # Fallback: flatten and take first N features
             vec = sv.ravel()[: len(self.feature_names)]
 
-        # Convert array → dict, safe-cast to float
-        out = {}
-        for i, fname in enumerate(self.feature_names):
-            try:
-                out[fname] = float(vec[i])
-            except Exception:
-                out[fname] = 0.0
-
-        return out
+        return vec
@@ -0,0 +1,100 @@
+# src/neighbors.py
+
+import os
+import numpy as np
+
+INDEX_DIR = "models"
+X_FILE = "neighbors_X.npy"
+Y_FILE = "neighbors_y.npy"
+NORMS_FILE = "neighbors_norms.npy"
+
+
+def build_index(X_train_scaled, y_train, out_dir=INDEX_DIR):
+    """
+    Persist the scaled training matrix (float32, row-major) with its labels
+    and precomputed squared row norms next to the model. Existing files are
+    replaced atomically, so live NeighborIndex maps are unaffected.
+    """
+    X = np.ascontiguousarray(X_train_scaled, dtype=np.float32)
+    y = np.asarray(y_train).reshape(-1)
+    if y.dtype == object:
+        y = y.astype(str)
+    if X.ndim != 2 or len(X) != len(y):
+        raise ValueError(f"Expected (n x d) matrix and n labels, got {X.shape} and {y.shape}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    arrays = {X_FILE: X, Y_FILE: y, NORMS_FILE: np.einsum("ij,ij->i", X, X)}
+
+    # Write to temp files and swap them in with os.replace: a running
+    # server may have the old files memory-mapped, and truncating those in
+    # place kills it with SIGBUS. Replaced files stay valid for the old map.
+    for name, arr in arrays.items():
+        tmp = os.path.join(out_dir, f".{name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, os.path.join(out_dir, name))
+    return NeighborIndex(out_dir)
+
+
+class NeighborIndex:
+    """
+    Exact k-nearest-neighbour search over the scaled training set.
+
+    The matrix is memory-mapped, so loading is instant and the OS page
+    cache is shared between worker processes. Queries run a blocked
+    brute-force kernel: per block, squared distances come from one float32
+    GEMM (|x|^2 - 2 q.x + |q|^2) and np.argpartition keeps the running
+    top-k, so peak memory is (n_queries x block) regardless of index size.
+    """
+
+    def __init__(self, index_dir=INDEX_DIR, block=65536):
+        path = os.path.join(index_dir, X_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Neighbour index not found at: {path}")
+
+        self.X = np.load(path, mmap_mode="r")
+        self.y = np.load(os.path.join(index_dir, Y_FILE), mmap_mode="r", allow_pickle=False)
+        self.norms = np.load(os.path.join(index_dir, NORMS_FILE), mmap_mode="r")
+        self.block = block
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    def query(self, Q, k=5):
+        """
+        Q: (n_queries x d) scaled rows
+        Returns (indices, distances), each (n_queries x k), nearest first.
+        """
+        Q = np.atleast_2d(np.asarray(Q, dtype=np.float32))
+        n = len(self)
+        k = min(k, n)
+        q_norms = np.einsum("ij,ij->i", Q, Q)[:, None]
+
+        best_d = np.full((Q.shape[0], 0), np.inf, dtype=np.float32)
+        best_i = np.empty((Q.shape[0], 0), dtype=np.int64)
+
+        for start in range(0, n, self.block):
+            stop = min(start + self.block, n)
+            d2 = self.norms[start:stop][None, :] - 2.0 * (Q @ self.X[start:stop].T) + q_norms
+
+            kb = min(k, stop - start)
+            part = np.argpartition(d2, kb - 1, axis=1)[:, :kb]
+            cand_d = np.concatenate([best_d, np.take_along_axis(d2, part, axis=1)], axis=1)
+            cand_i = np.concatenate([best_i, part + start], axis=1)
+
+            keep = np.argpartition(cand_d, k - 1, axis=1)[:, :k] if cand_d.shape[1] > k else \
+                np.broadcast_to(np.arange(cand_d.shape[1]), cand_d.shape)
+            best_d = np.take_along_axis(cand_d, keep, axis=1)
+            best_i = np.take_along_axis(cand_i, keep, axis=1)
+
+        order = np.argsort(best_d, axis=1)
+        best_d = np.take_along_axis(best_d, order, axis=1)
+        best_i = np.take_along_axis(best_i, order, axis=1)
+        return best_i, np.sqrt(np.maximum(best_d, 0.0))
+
+    def labels(self, indices, label_map=None):
+        """Stored labels for the given rows; integer class ids go through label_map."""
+        raw = np.asarray(self.y)[indices]
+        if label_map is not None and np.issubdtype(raw.dtype, np.integer):
+            return [label_map.get(int(v), str(v)) for v in raw]
+        return [str(v) for v in raw]
@@ -1,5 +1,6 @@
 # src/predict.py
 
+import hashlib
 import joblib
 import numpy as np
 from pathlib import Path
@@ -20,6 +21,9 @@ class ModelPredictor:
 
         self.model = joblib.load(MODEL_PATH)
 
+        # Short content hash of the model file, recorded in the audit log
+        self.version = hashlib.sha256(MODEL_PATH.read_bytes()).hexdigest()[:12]
+
     def predict(self, X):
         """
         Returns:
@@ -52,3 +56,32 @@ class ModelPredictor:
         }
 
         return pred_label_dict, probs_map
+
+    def predict_batch(self, X):
+        """
+        Score an (n_rows x 24) scaled matrix in one model call.
+
+        Returns:
+            labels = ["Diabetes", ...]            (one per row)
+            probs  = np.ndarray (n_rows x n_classes)
+        """
+
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        try:
+            probs = np.asarray(self.model.predict_proba(X), dtype=float)
+        except:
+            raw = np.asarray(self.model.decision_function(X), dtype=float)
+            exp = np.exp(raw - raw.max(axis=1, keepdims=True))
+            probs = exp / exp.sum(axis=1, keepdims=True)
+
+        class_index = np.asarray(self.model.predict(X)).reshape(-1).astype(int)
+        labels = [DISEASE_MAP[int(i)] for i in class_index]
+
+        return labels, probs
+
+    def probs_to_map(self, probs_row):
+        """Single probability row → {label: prob}"""
+        return {DISEASE_MAP[i]: float(p) for i, p in enumerate(probs_row)}
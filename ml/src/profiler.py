@@ -0,0 +1,121 @@
+# src/profiler.py
+
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from collections import Counter
+
+# Files whose allocation sites are reported by trace_allocations
+ML_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALLOCATION_TARGETS = (
+    os.path.join(ML_ROOT, "main.py"),
+    os.path.join(ML_ROOT, "src", "scaling_bridge.py"),
+    os.path.join(ML_ROOT, "src", "explainability.py"),
+)
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+
+def sample_stacks(seconds, interval=0.005):
+    """
+    Sample every thread's Python stack every `interval` seconds for
+    `seconds`, using sys._current_frames() (no tracing hooks, so the
+    profiled code runs at full speed between samples).
+
+    Returns Counter{collapsed_stack: samples}.
+    """
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profiling session is already running")
+
+    me = threading.get_ident()
+    stacks = Counter()
+    try:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(f"thread:{names.get(ident, ident)}")
+                stacks[";".join(reversed(labels))] += 1
+            time.sleep(interval)
+    finally:
+        _busy.release()
+
+    return stacks
+
+
+def collapsed(stacks):
+    """Counter → collapsed-stack text (flamegraph.pl / speedscope input)."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def trace_allocations(seconds, targets=ALLOCATION_TARGETS, top=20, frames=25):
+    """
+    Record allocations for `seconds` with tracemalloc and attribute each
+    allocation to the innermost frame inside one of `targets` (so memory
+    allocated by NumPy/SHAP on behalf of ScalingBridge shows up at the
+    calling line).
+
+    Sizes are net: memory allocated during the window and still live at
+    its end. peak_kib is the traced peak over the whole window.
+
+    Returns a summary dict with the top `top` sites by bytes allocated.
+    """
+    targets = {os.path.abspath(t) for t in targets}
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profiling session is already running")
+
+    started = not tracemalloc.is_tracing()
+    try:
+        if started:
+            tracemalloc.start(frames)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        if started:
+            tracemalloc.stop()
+        _busy.release()
+
+    diff = after.compare_to(before, "traceback")
+
+    sites = Counter()
+    counts = Counter()
+    for stat in diff:
+        if stat.size_diff <= 0:
+            continue
+        for frame in reversed(stat.traceback):
+            if os.path.abspath(frame.filename) in targets:
+                key = f"{os.path.basename(frame.filename)}:{frame.lineno}"
+                sites[key] += stat.size_diff
+                counts[key] += max(stat.count_diff, 0)
+                break
+
+    return {
+        "seconds": seconds,
+        "targets": sorted(os.path.relpath(t, ML_ROOT) for t in targets),
+        "total_kib": round(sum(sites.values()) / 1024, 1),
+        "peak_kib": round(peak / 1024, 1),
+        "sites": [
+            {"site": site, "size_kib": round(size / 1024, 1), "count": counts[site]}
+            for site, size in sites.most_common(top)
+        ],
+    }
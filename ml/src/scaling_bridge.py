@@ -28,6 +28,10 @@ class ScalingBridge:
         # FIXED — now always available
         self.feature_order = list(self.meta.keys())
 
+        # Vectorised bounds in feature_order, used for whole-matrix scaling
+        self.lo = np.array([float(self.meta[f]["min"]) for f in self.feature_order], dtype=float)
+        self.hi = np.array([float(self.meta[f]["max"]) for f in self.feature_order], dtype=float)
+
         return self.meta
 
     def scale_value(self, feature, value):
@@ -40,7 +44,7 @@ class ScalingBridge:
         scaled = (v - lo) / (hi - lo)
         return float(np.clip(scaled, 0.0, 1.0))
 
-    def scale_dict(self, incoming):
+    def scale_dict(self, incoming, clip=True):
         """
         Convert dict → 1x24 numpy array
         """
@@ -48,8 +52,19 @@ class ScalingBridge:
         for feat in self.feature_order:
             if feat not in incoming:
                 raise KeyError(f"Missing input: {feat}")
-            row.append(self.scale_value(feat, incoming[feat]))
-        return np.array([row], dtype=float)
+            row.append(float(incoming[feat]))
+        return self.scale_matrix([row], clip=clip)
+
+    def scale_matrix(self, X, clip=True):
+        """
+        Scale an (n_rows x 24) raw matrix already in feature_order.
+        clip=False keeps out-of-range values so callers can count them.
+        """
+        X = np.asarray(X, dtype=float)
+        scaled = (X - self.lo) / (self.hi - self.lo)
+        if clip:
+            np.clip(scaled, 0.0, 1.0, out=scaled)
+        return scaled
 
     def unscale_value(self, feat, scaled):
         lo = float(self.meta[feat]["min"])
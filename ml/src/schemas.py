@@ -1,13 +1,32 @@
-from pydantic import BaseModel
-from typing import Dict, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+
+# Upper bound on similar patients returned per request, so the endpoint
+# cannot be used to page through the training set
+MAX_NEIGHBORS = 20
 
 
 class PredictRequest(BaseModel):
     features: Dict[str, float]
     top_k: Optional[int] = None
+    neighbors: Optional[int] = Field(None, ge=1, le=MAX_NEIGHBORS)
+
+class Neighbor(BaseModel):
+    index: int
+    label: str
+    distance: float
 
 class PredictResponse(BaseModel):
     prediction: Dict[str, str]
     probabilities: Dict[str, float]
     scaled_values: Dict[str, float]
     shap_values: Dict[str, float]
+    neighbors: Optional[List[Neighbor]] = None
+
+class PredictBatchRequest(BaseModel):
+    rows: List[Dict[str, float]]
+
+class PredictBatchResponse(BaseModel):
+    predictions: List[Dict[str, str]]
+    probabilities: List[Dict[str, float]]
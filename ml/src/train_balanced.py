@@ -1,4 +1,5 @@
 import os
+import glob
 import json
 import joblib
 import pandas as pd
@@ -9,35 +10,32 @@ from sklearn.metrics import classification_report, accuracy_score
 from xgboost import XGBClassifier
 from sklearn.utils.class_weight import compute_class_weight
 
+import sys
+sys.path.insert(0, ".")  # run as `python src/train_balanced.py` from ml/
+from src.neighbors import build_index
+from src.data_pipeline import CACHE_DIR, TARGET, DatasetStats, prepare_dataset, load_prepared
+
 # Paths
-DATA_PATH = "data/raw/data1.csv"
 MODEL_PATH = "models/model.joblib"
 CLASS_MAP_PATH = "metadata/class_mapping.json"
 FEATURE_META_PATH = "metadata/features_metadata.json"
 
-def load_dataset():
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f"Dataset not found at {DATA_PATH}")
-    df = pd.read_csv(DATA_PATH)
-    return df
-
-def build_feature_metadata(df, features):
-    meta = {}
-    for col in features:
-        min_v = float(df[col].min())
-        max_v = float(df[col].max())
-        if min_v == max_v:
-            max_v += 1
-        meta[col] = {"min": min_v, "max": max_v}
-    return meta
-
-def train_model():
+def load_dataset(refresh=False):
+    """
+    Deduplicated parquet cache from src.data_pipeline, built from
+    data/raw/*.csv on first use (or when refresh=True).
+    """
+    if refresh or not glob.glob(os.path.join(CACHE_DIR, "part-*.parquet")):
+        prepare_dataset()
+    return load_prepared()
+
+def train_model(refresh=False):
     print("\n=== 🔥 BALANCED TRAINING STARTED ===\n")
 
-    df = load_dataset()
+    df = load_dataset(refresh)
 
     # Target column
-    target = "Disease"
+    target = TARGET
 
     # Features = all except Disease
     features = [c for c in df.columns if c != target]
@@ -71,7 +69,7 @@ def train_model():
     scaler.fit(X_train)
 
     # Save feature metadata
-    feature_meta = build_feature_metadata(df, features)
+    feature_meta = DatasetStats(features, target).update(df).features_metadata()
     os.makedirs("metadata", exist_ok=True)
     with open(FEATURE_META_PATH, "w") as f:
         json.dump(feature_meta, f, indent=2)
@@ -118,10 +116,14 @@ def train_model():
     with open(CLASS_MAP_PATH, "w") as f:
         json.dump(idx_to_class, f, indent=2)
 
+    # Similar-patient index over the scaled training rows
+    build_index(X_train_scaled, y_train.values, out_dir="models")
+
     print("\n🎉 Training Complete!")
     print("📁 Saved model:", MODEL_PATH)
     print("📁 Saved class mapping:", CLASS_MAP_PATH)
     print("📁 Saved feature metadata:", FEATURE_META_PATH)
+    print("📁 Saved neighbour index: models/neighbors_*.npy")
 
 if __name__ == "__main__":
-    train_model()
+    train_model(refresh="--refresh" in sys.argv)